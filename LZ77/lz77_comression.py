@@ -1,15 +1,43 @@
 import os
+import mmap
 import time
+import struct
 import pickle
-import matplotlib.pyplot as plt
 
-def lz77_compress(input_data, window_size=20):
-    """Compress input data using the LZ77 algorithm."""
+CHUNK_SIZE = 64 * 1024
+# distance, length, next byte (256 when there is none); same layout as codec_registry
+TOKEN = struct.Struct(">IIH")
+
+def lz77_compress(input_data, window_size=20, preset=b"", stats=None):
+    """Compress input data using the LZ77 algorithm.
+
+    Returns the list of (distance, length, next byte) triples; see
+    iter_lz77_compress for the arguments.
+    """
+    return list(iter_lz77_compress(input_data, window_size, preset, stats))
+
+def iter_lz77_compress(input_data, window_size=20, preset=b"", stats=None):
+    """Yield the (distance, length, next byte) triples of input data one by one.
+
+    preset primes the window (e.g. with a pretrained dictionary) so matches
+    can be found from the very first byte. stats, if given, receives the time
+    spent in match search and window maintenance and match counters.
+    input_data can be any bytes-like object (e.g. an mmap); it is only
+    accessed through memoryview slices, so nothing is copied.
+    """
+    timed = stats is not None
+    search_time = window_time = 0.0
+    matches = match_length = 0
     i = 0
-    compressed = []
-    window = b""
-    input_bytes = bytes(input_data) if not isinstance(input_data, bytes) else input_data
+    compressed = 0
+    window = preset[-window_size:] if preset else b""
+    try:
+        input_bytes = memoryview(input_data).cast("B")
+    except TypeError:
+        input_bytes = memoryview(bytes(input_data))
     while i < len(input_bytes):
+        if timed:
+            start = time.perf_counter()
         distance = 0
         length = 0
         lookahead_buffer = input_bytes[i:]
@@ -22,21 +50,46 @@ def lz77_compress(input_data, window_size=20):
             else:
                 break
         if length > 0:
-            next_char = lookahead_buffer[length:length+1] if i + length < len(input_bytes) else b''
+            next_char = bytes(lookahead_buffer[length:length+1]) if i + length < len(input_bytes) else b''
         else:
-            next_char = input_bytes[i:i+1]
-        compressed.append((distance, length, next_char))
+            next_char = bytes(input_bytes[i:i+1])
+        compressed += 1
+        yield distance, length, next_char
+        if timed:
+            found = time.perf_counter()
+            search_time += found - start
         shift = length + 1
         window += input_bytes[i:i+shift]
         if len(window) > window_size:
             window = window[-window_size:]
+        if timed:
+            window_time += time.perf_counter() - found
+            if length > 0:
+                matches += 1
+                match_length += length
         i += shift
-    return compressed
+    if timed:
+        stats.add_time("match_search", search_time)
+        stats.add_time("window", window_time)
+        stats.count("bytes_in", len(input_bytes))
+        stats.count("tokens", compressed)
+        stats.count("matches", matches)
+        stats.count("match_length_total", match_length)
+        stats.set("avg_match_length", match_length / matches if matches else 0.0)
 
-def lz77_decompress(compressed):
-    """Decompress LZ77-compressed data."""
-    result = bytearray()
+def lz77_decompress(compressed, preset=b"", stats=None, max_output=None):
+    """Decompress LZ77-compressed data.
+
+    preset must be the same window preset that was used for compression.
+    A few tokens can expand to a huge output, so when max_output is given
+    decoding stops with ValueError as soon as the output would exceed it.
+    """
+    if stats is not None:
+        decode_start = time.perf_counter()
+    result = bytearray(preset)
     for distance, length, char_bytes in compressed:
+        if max_output is not None and len(result) - len(preset) + length + len(char_bytes) > max_output:
+            raise ValueError(f"Decompressed output exceeds {max_output} bytes")
         if distance == 0 and length == 0:
             result.extend(char_bytes)
         else:
@@ -44,18 +97,61 @@ def lz77_decompress(compressed):
             for i in range(length):
                 result.append(result[start + i])
             result.extend(char_bytes)
-    return bytes(result)
+    if stats is not None:
+        stats.add_time("decode", time.perf_counter() - decode_start)
+        stats.count("tokens", len(compressed))
+        stats.count("bytes_out", len(result) - len(preset))
+    return bytes(result[len(preset):])
 
-def get_compressed_size(compressed_data):
-    """Return the byte size of compressed data."""
+def lz77_decompress_to_file(compressed, out, window_size, chunk_size=CHUNK_SIZE):
+    """Decompress triples into an open binary file.
+
+    Only the last window_size bytes are needed to resolve matches, so
+    everything older is written out in chunks instead of kept in memory.
+    Returns the number of bytes written.
+    """
+    result = bytearray()
+    written = 0
+    for distance, length, char_bytes in compressed:
+        start = len(result) - distance
+        for i in range(length):
+            result.append(result[start + i])
+        result.extend(char_bytes)
+        if len(result) >= window_size + chunk_size:
+            out.write(result[:-window_size])
+            written += len(result) - window_size
+            del result[:-window_size]
+    out.write(result)
+    return written + len(result)
+
+def write_tokens(compressed, f):
+    """Write triples to an open binary file as they come, in the >IIH layout
+    (distance, length, next byte or 256 when there is none).
+    Returns the size get_compressed_size would report for them.
+    """
     size = 0
-    for distance, length, _ in compressed_data:
-        distance_size = 1 if distance < 256 else 2 if distance < 65536 else 4
-        length_size = 1 if length < 256 else 2 if length < 65536 else 4
-        char_size = 1
-        size += distance_size + length_size + char_size
+    for distance, length, next_char in compressed:
+        f.write(TOKEN.pack(distance, length, next_char[0] if next_char else 256))
+        size += token_size(distance, length)
     return size
 
+def read_tokens(f, chunk_size=CHUNK_SIZE):
+    """Yield the triples written by write_tokens, reading the file in chunks."""
+    chunk_size -= chunk_size % TOKEN.size
+    while chunk := f.read(chunk_size):
+        for distance, length, char in TOKEN.iter_unpack(chunk):
+            yield distance, length, bytes([char]) if char < 256 else b""
+
+def token_size(distance, length):
+    """Return the byte size of one triple with variable-width distance and length."""
+    distance_size = 1 if distance < 256 else 2 if distance < 65536 else 4
+    length_size = 1 if length < 256 else 2 if length < 65536 else 4
+    return distance_size + length_size + 1
+
+def get_compressed_size(compressed_data):
+    """Return the byte size of compressed data."""
+    return sum(token_size(distance, length) for distance, length, _ in compressed_data)
+
 def process_text_file(file_path, window_size):
     """Compress and decompress a text file, returning stats."""
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -88,25 +184,37 @@ def process_text_file(file_path, window_size):
     }
 
 def process_video_file(file_path, window_size):
-    """Compress and decompress a video file, returning stats."""
-    with open(file_path, 'rb') as file:
-        data = file.read()
-    original_size = len(data)
-    start_time = time.time()
-    compressed_data = lz77_compress(data, window_size)
-    compression_time = time.time() - start_time
-    compressed_size = get_compressed_size(compressed_data)
-    start_time = time.time()
-    decompressed_data = lz77_decompress(compressed_data)
-    decompression_time = time.time() - start_time
-    assert decompressed_data == data, "Decompression did not restore the original"
-    ratio = original_size / compressed_size if compressed_size != 0 else float('inf')
+    """Compress and decompress a video file, returning stats.
+
+    The video is memory-mapped rather than read into memory. Triples are
+    written to the compressed file as they are produced (see write_tokens),
+    and decompression reads them back and writes the video as it goes, so
+    neither the triples nor the decompressed video are held in memory.
+    Times include writing the outputs.
+    """
     compressed_file_path = file_path.replace('.mp4', '_compressed.bin')
-    with open(compressed_file_path, 'wb') as f:
-        pickle.dump(compressed_data, f)
     decompressed_file_path = file_path.replace('.mp4', '_decompressed.mp4')
-    with open(decompressed_file_path, 'wb') as f:
-        f.write(decompressed_data)
+    with open(file_path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(file_path) else b''
+    try:
+        original_size = len(data)
+        start_time = time.time()
+        with open(compressed_file_path, 'wb') as f:
+            compressed_size = write_tokens(iter_lz77_compress(data, window_size), f)
+        compression_time = time.time() - start_time
+        start_time = time.time()
+        with open(compressed_file_path, 'rb') as f, open(decompressed_file_path, 'wb') as out:
+            lz77_decompress_to_file(read_tokens(f), out, window_size)
+        decompression_time = time.time() - start_time
+        with open(decompressed_file_path, 'rb') as f, memoryview(data) as view:
+            for start in range(0, original_size, CHUNK_SIZE):
+                assert f.read(CHUNK_SIZE) == view[start:start + CHUNK_SIZE], \
+                    "Decompression did not restore the original"
+            assert not f.read(1), "Decompression did not restore the original"
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    ratio = original_size / compressed_size if compressed_size != 0 else float('inf')
     return {
         'original_size': original_size,
         'compressed_size': compressed_size,
@@ -119,6 +227,8 @@ def process_video_file(file_path, window_size):
 
 def compare_files(files, window_size=10000):
     """Compare compression stats across files and show plots."""
+    import matplotlib.pyplot as plt
+
     original_sizes = []
     compressed_sizes = []
     compression_ratios = []
@@ -165,9 +275,10 @@ def compare_files(files, window_size=10000):
     plt.tight_layout()
     plt.show()
 
-files = [
-    'input_text1.txt',
-    'input_text2.txt',
-    'small_video.mp4'
-]
-compare_files(files)
\ No newline at end of file
+if __name__ == "__main__":
+    files = [
+        'input_text1.txt',
+        'input_text2.txt',
+        'small_video.mp4'
+    ]
+    compare_files(files)
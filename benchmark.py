@@ -0,0 +1,434 @@
+"""Headless benchmark for every codec in the project.
+
+Usage:
+    python benchmark.py run --json results.json --csv results.csv
+    python benchmark.py run --baseline baseline.json
+    python benchmark.py plot results.json
+    python benchmark.py memory --size-mb 8
+
+Each codec is timed with perf_counter over a number of warmup and measured
+runs on the bundled sample files and on synthetic data. Peak memory is
+measured with tracemalloc on a separate run so it doesn't affect timings.
+
+The memory command compares the file entry points before and after
+memory-mapped input / streamed output: each case runs in a fresh process
+and reports wall time and the peak RSS of that process.
+"""
+import os
+import csv
+import sys
+import glob
+import json
+import array
+import queue
+import pickle
+import tempfile
+import multiprocessing
+import argparse
+import statistics
+import tracemalloc
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# lzw.py lives in lzw_txt/, which is not a package
+if os.path.join(ROOT, "lzw_txt") not in sys.path:
+    sys.path.append(os.path.join(ROOT, "lzw_txt"))
+
+import codec_registry
+from codec_registry import CODECS, get_codec
+from codec_stats import CodecStats
+from huffman import build_huffman_tree, build_codes, compress_file
+from lzw import read_wav_file, lzw_encode, CodeWriter
+from samples import synthetic_data
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SAMPLE_PATTERNS = ["*.txt", "*.mp4", "*.wav", "*.bmp"]
+SAMPLE_DIRS = [ROOT, os.path.join(ROOT, "LZ77"), os.path.join(ROOT, "lzw_txt")]
+MAX_BYTES = 64 * 1024
+FIELDS = ["codec", "input", "size", "compressed_size", "ratio",
+          "compress_s", "decompress_s", "compress_mb_s", "decompress_mb_s",
+          "peak_memory", "roundtrip_ok"]
+
+def sample_files():
+    """
+    Returns the sample files bundled with the project, skipping outputs of earlier runs.
+    """
+    paths = []
+    for folder in SAMPLE_DIRS:
+        for pattern in SAMPLE_PATTERNS:
+            for path in sorted(glob.glob(os.path.join(folder, pattern))):
+                name = os.path.basename(path)
+                if "_compressed" in name or "_decompressed" in name:
+                    continue
+                paths.append(path)
+    return paths
+
+def build_corpus(paths=None, max_bytes=MAX_BYTES, synthetic=True):
+    """
+    Reads the corpus as a list of (name, data) pairs. Files are truncated to
+    max_bytes since the pure Python codecs are slow on large inputs.
+    """
+    corpus = []
+    for path in sample_files() if paths is None else paths:
+        with open(path, "rb") as f:
+            data = f.read(max_bytes) if max_bytes else f.read()
+        corpus.append((os.path.relpath(path, ROOT), data))
+    if synthetic:
+        corpus.extend(synthetic_data(max_bytes or MAX_BYTES))
+    return corpus
+
+def time_call(func, arg, warmup, repeats):
+    """
+    Runs func(arg) warmup times, then repeats times, and returns the median
+    duration in seconds together with the last result.
+    """
+    for _ in range(warmup):
+        func(arg)
+    durations = []
+    result = None
+    for _ in range(repeats):
+        start = perf_counter()
+        result = func(arg)
+        durations.append(perf_counter() - start)
+    return statistics.median(durations), result
+
+def peak_memory(func, arg):
+    """
+    Returns the peak memory in bytes allocated while running func(arg).
+    """
+    tracemalloc.start()
+    try:
+        func(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def throughput(size, seconds):
+    return size / seconds / 1e6 if seconds else float("inf")
+
+def collect_stats(codec, data, dict_id=None):
+    """
+    Runs one instrumented compress (and decompress) and returns the per-stage breakdown.
+    """
+    stats = {"compress": CodecStats()}
+    blob = codec.compress(data, dict_id, stats["compress"])
+    if codec.decompress is not None:
+        stats["decompress"] = CodecStats()
+        codec.decompress(blob, dict_id, stats["decompress"])
+    return {key: value.as_dict() for key, value in stats.items()}
+
+def run_case(codec, name, data, warmup=1, repeats=5, dict_id=None, with_stats=False):
+    """
+    Benchmarks one codec on one input and returns a result row.
+    With with_stats the row also gets a "stats" entry from an extra
+    instrumented run, so timings stay uninstrumented.
+    """
+    compress = lambda d: codec.compress(d, dict_id)
+    compress_s, blob = time_call(compress, data, warmup, repeats)
+    row = {
+        "codec": codec.name,
+        "input": name,
+        "size": len(data),
+        "compressed_size": len(blob),
+        "ratio": len(data) / len(blob) if blob else float("inf"),
+        "compress_s": compress_s,
+        "decompress_s": None,
+        "compress_mb_s": throughput(len(data), compress_s),
+        "decompress_mb_s": None,
+        "peak_memory": peak_memory(compress, data),
+        "roundtrip_ok": None,
+    }
+    if codec.decompress is not None:
+        decompress = lambda b: codec.decompress(b, dict_id)
+        decompress_s, restored = time_call(decompress, blob, warmup, repeats)
+        row["decompress_s"] = decompress_s
+        row["decompress_mb_s"] = throughput(len(data), decompress_s)
+        row["roundtrip_ok"] = restored == data
+    if with_stats:
+        row["stats"] = collect_stats(codec, data, dict_id)
+    return row
+
+def run_suite(codec_names, corpus, warmup=1, repeats=5, dict_id=None, verbose=True,
+              with_stats=False):
+    """
+    Benchmarks every codec on every input of the corpus.
+    """
+    results = []
+    for codec_name in codec_names:
+        codec = get_codec(codec_name)
+        for name, data in corpus:
+            row = run_case(codec, name, data, warmup, repeats, dict_id, with_stats)
+            results.append(row)
+            if verbose:
+                print(f"{row['codec']:<8} {row['input']:<32} {row['size']:>9} B  "
+                      f"ratio {row['ratio']:>6.2f}  {row['compress_mb_s']:>8.3f} MB/s  "
+                      f"peak {row['peak_memory'] / 1024:>9.1f} KiB", file=sys.stderr)
+    return results
+
+def write_json(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+def write_csv(results, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def compare_to_baseline(results, baseline, threshold=0.1):
+    """
+    Returns a list of human readable regressions: throughput that dropped or
+    a ratio that got worse by more than threshold (a fraction), and round
+    trips that stopped working.
+    """
+    previous = {(row["codec"], row["input"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = previous.get((row["codec"], row["input"]))
+        if old is None:
+            continue
+        label = f"{row['codec']} on {row['input']}"
+        for key in ("compress_mb_s", "decompress_mb_s", "ratio"):
+            if old.get(key) and row[key] is not None and row[key] < old[key] * (1 - threshold):
+                regressions.append(f"{label}: {key} {old[key]:.3f} -> {row[key]:.3f}")
+        if old.get("roundtrip_ok") and row["roundtrip_ok"] is False:
+            regressions.append(f"{label}: round trip no longer restores the input")
+    return regressions
+
+def plot_results(results):
+    """
+    Plots ratio and compression throughput per input. Needs matplotlib.
+    """
+    import matplotlib.pyplot as plt
+
+    codecs = sorted({row["codec"] for row in results})
+    inputs = sorted({row["input"] for row in results})
+    by_key = {(row["codec"], row["input"]): row for row in results}
+    width = 0.8 / len(codecs)
+    _, axes = plt.subplots(2, 1, figsize=(12, 9))
+    for n, codec in enumerate(codecs):
+        x = [i + n * width for i in range(len(inputs))]
+        rows = [by_key.get((codec, name), {}) for name in inputs]
+        axes[0].bar(x, [row.get("ratio") or 0 for row in rows], width=width, label=codec)
+        axes[1].bar(x, [row.get("compress_mb_s") or 0 for row in rows], width=width, label=codec)
+    for ax, title in zip(axes, ["Compression ratio (higher is better)", "Compression speed (MB/s)"]):
+        ax.set_xticks([i + 0.4 - width / 2 for i in range(len(inputs))])
+        ax.set_xticklabels(inputs, rotation=45, ha="right")
+        ax.set_title(title)
+        ax.legend()
+    plt.tight_layout()
+    plt.show()
+
+# The "before" cases are pinned copies of the code as it was before
+# memory-mapping and histogram.py, so they keep measuring the old paths.
+
+def huffman_before(path):
+    # whole file read into memory, counted byte by byte, bit string and output built before writing
+    with open(path, "rb") as f:
+        data = f.read()
+    freq = {}
+    for byte in data:
+        freq[byte] = freq.get(byte, 0) + 1
+    codes = build_codes(build_huffman_tree(freq))
+    encoded_bits = ''.join(codes[byte] for byte in data)
+    padded_bits = encoded_bits + '0' * ((8 - len(encoded_bits) % 8) % 8)
+    byte_array = bytearray(int(padded_bits[i:i+8], 2) for i in range(0, len(padded_bits), 8))
+    with open(path + ".before.huff", "wb") as out:
+        pickle.dump((byte_array, codes, len(encoded_bits)), out)
+
+def huffman_after(path):
+    compress_file(path)
+
+def lzw_before(path):
+    frames, _ = read_wav_file(path)
+    with open(path + ".before.lzw", "wb") as f:
+        array.array('I', lzw_encode(frames)).tofile(f)
+
+def lzw_after(path):
+    frames, _ = read_wav_file(path, use_mmap=True)
+    with open(path + ".after.lzw", "wb") as f, CodeWriter(f) as writer:
+        lzw_encode(frames, sink=writer)
+
+def deflate_before(path):
+    from collections import Counter
+    from PIL import Image
+    import numpy as np
+    from deflate import rle_encode, build_huffman_tree, generate_huffman_codes
+    img = Image.open(path).convert('L')
+    pixels = np.array(img).flatten()
+    symbols = [(pixel, run) for pixel, run in rle_encode(pixels)]
+    huffman_codes = generate_huffman_codes(build_huffman_tree(Counter(symbols)))
+    compressed_data = ""
+    for symbol in symbols:
+        compressed_data += huffman_codes[symbol]
+    with open(path + ".before.out", "wb") as f:
+        pickle.dump(huffman_codes, f)
+        f.write(int(compressed_data, 2).to_bytes((len(compressed_data) + 7) // 8, 'big'))
+
+def deflate_after(path):
+    from deflate import compress_image
+    compress_image(path, path + ".after.out")
+
+MEMORY_CASES = {
+    "huffman": (huffman_before, huffman_after),
+    "lzw_wav": (lzw_before, lzw_after),
+}
+if codec_registry.compress_pixels is not None:
+    MEMORY_CASES["deflate_bmp"] = (deflate_before, deflate_after)
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes, None where unsupported.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def memory_inputs(folder, size):
+    """
+    Writes one input file per memory case into folder and returns {case: path}.
+    """
+    data = dict(synthetic_data(size))["synthetic_text"]
+    paths = {"huffman": os.path.join(folder, "input.txt"), "lzw_wav": os.path.join(folder, "input.wav")}
+    with open(paths["huffman"], "wb") as f:
+        f.write(data)
+    import wave
+    with wave.open(paths["lzw_wav"], "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(data[:len(data) - len(data) % 2])
+    if "deflate_bmp" in MEMORY_CASES:
+        from PIL import Image
+        import numpy as np
+        side = int(size ** 0.5)
+        paths["deflate_bmp"] = os.path.join(folder, "input.bmp")
+        Image.fromarray(np.frombuffer(data[:side * side], dtype=np.uint8).reshape(side, side)).save(paths["deflate_bmp"])
+    return paths
+
+def memory_case(case, mode, path, results):
+    """
+    Runs one memory case; meant to be the target of a fresh process.
+    Puts (wall time, baseline RSS, peak RSS, None) on results, or
+    (None, None, None, error message) if the case raised.
+    """
+    func = MEMORY_CASES[case][0 if mode == "before" else 1]
+    baseline = peak_rss()
+    start = perf_counter()
+    try:
+        func(path)
+    except Exception as e:
+        results.put((None, None, None, f"{type(e).__name__}: {e}"))
+        return
+    results.put((perf_counter() - start, baseline, peak_rss(), None))
+
+def case_result(process, results, poll=1.0):
+    """
+    Waits for the result of a memory case process. A process that dies
+    without reporting (e.g. killed for running out of memory) gives an error result.
+    """
+    while True:
+        try:
+            return results.get(timeout=poll)
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    return results.get(timeout=poll)
+                except queue.Empty:
+                    return None, None, None, f"process exited with code {process.exitcode}"
+
+def run_memory_benchmark(cases, size, verbose=True):
+    """
+    Runs every case before/after in its own spawned process and returns result rows.
+    A case that fails gets a row with its error instead of timings.
+    """
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        paths = memory_inputs(folder, size)
+        for case in cases:
+            for mode in ("before", "after"):
+                results = context.Queue()
+                process = context.Process(target=memory_case, args=(case, mode, paths[case], results))
+                process.start()
+                wall, baseline, peak, error = case_result(process, results)
+                process.join()
+                rows.append({"case": case, "mode": mode, "size": os.path.getsize(paths[case]),
+                             "wall_s": wall, "baseline_rss": baseline, "peak_rss": peak, "error": error})
+                if error is not None:
+                    if verbose:
+                        print(f"{case:<12} {mode:<7} FAILED: {error}", file=sys.stderr)
+                    continue
+                if verbose:
+                    rss = "n/a" if peak is None else f"{peak / 2**20:8.1f} MiB (baseline {baseline / 2**20:.1f})"
+                    print(f"{case:<12} {mode:<7} {wall:>8.3f} s  peak RSS {rss}", file=sys.stderr)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compression codecs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark")
+    run.add_argument("--codecs", nargs="+", default=list(CODECS), choices=list(CODECS))
+    run.add_argument("--files", nargs="+", help="input files (default: bundled samples)")
+    run.add_argument("--max-bytes", type=int, default=MAX_BYTES,
+                     help="truncate inputs to this size, 0 for whole files")
+    run.add_argument("--no-synthetic", action="store_true")
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--dict-id", help="pretrained dictionary to compress with")
+    run.add_argument("--stats", action="store_true",
+                     help="add per-stage timings and counters to the JSON results")
+    run.add_argument("--json", help="write results as JSON")
+    run.add_argument("--csv", help="write results as CSV")
+    run.add_argument("--baseline", help="JSON results to compare against")
+    run.add_argument("--threshold", type=float, default=0.1,
+                     help="allowed relative slowdown before reporting a regression")
+
+    plot = commands.add_parser("plot", help="plot saved JSON results")
+    plot.add_argument("results")
+
+    memory = commands.add_parser("memory", help="compare peak RSS and wall time of the "
+                                 "file entry points before and after mmap/streaming")
+    memory.add_argument("--cases", nargs="+", default=list(MEMORY_CASES), choices=list(MEMORY_CASES))
+    memory.add_argument("--size-mb", type=float, default=4)
+    memory.add_argument("--json", help="write results as JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "plot":
+        plot_results(load_results(args.results))
+        return 0
+    if args.command == "memory":
+        rows = run_memory_benchmark(args.cases, int(args.size_mb * 1024 * 1024))
+        if args.json:
+            write_json(rows, args.json)
+        return 1 if any(row["error"] for row in rows) else 0
+
+    corpus = build_corpus(args.files, args.max_bytes, not args.no_synthetic)
+    results = run_suite(args.codecs, corpus, args.warmup, args.repeats, args.dict_id,
+                        with_stats=args.stats)
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+    failed = [row for row in results if row["roundtrip_ok"] is False]
+    for row in failed:
+        print(f"FAILED round trip: {row['codec']} on {row['input']}", file=sys.stderr)
+    regressions = []
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_results(args.baseline), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if failed or regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
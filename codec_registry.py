@@ -0,0 +1,241 @@
+"""Byte-in, byte-out wrappers around every codec in the project.
+
+The codecs themselves return Python structures (code lists, triples,
+pickled tables). The wrappers here serialize them to compact bytes so the
+benchmark and other tools can treat all algorithms the same way.
+"""
+import os
+import sys
+import array
+import struct
+import pickle
+
+from dictionary import load_dictionary, VERSION_SIZE
+from codec_stats import stage
+from huffman import build_frequency_dict, build_huffman_tree, build_codes, encode_data, decode_data
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for folder in ("LZ77", "lzw_txt"):
+    if os.path.join(ROOT, folder) not in sys.path:
+        sys.path.append(os.path.join(ROOT, folder))
+
+from lz77_comression import lz77_compress, lz77_decompress
+from lzw import lzw_encode, lzw_decode
+
+try:
+    import numpy as np
+    from deflate import compress_pixels
+except ImportError:
+    compress_pixels = None
+
+LZ77_WINDOW_SIZE = 10000
+
+class Codec:
+    """A named pair of bytes -> bytes functions.
+
+    decompress is None for codecs that only implement compression.
+    Both functions take an optional pretrained dictionary id and an
+    optional CodecStats; decompress also takes max_output, the largest
+    output it may produce before giving up with ValueError.
+    """
+    def __init__(self, name, compress, decompress=None):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+def huffman_compress(data, dict_id=None, stats=None):
+    """
+    Header: bit length, then the symbol frequencies the tree was built from
+    (or the dictionary version when a pretrained dictionary is used), then
+    the packed bits.
+    """
+    if dict_id is not None:
+        dictionary = load_dictionary(dict_id)
+        with stage(stats, "pack"):
+            byte_array, bit_length = encode_data(data, dictionary["huffman"])
+        return struct.pack(">Q", bit_length) + dictionary["version"] + bytes(byte_array)
+    with stage(stats, "frequency"):
+        freq = build_frequency_dict(data)
+    with stage(stats, "tree"):
+        codes = build_codes(build_huffman_tree(freq))
+    with stage(stats, "pack"):
+        byte_array, bit_length = encode_data(data, codes)
+    if stats is not None:
+        stats.count("table_builds")
+    header = struct.pack(">QH", bit_length, len(freq))
+    table = b"".join(struct.pack(">BI", byte, count) for byte, count in freq.items())
+    return header + table + bytes(byte_array)
+
+def huffman_decompress(blob, dict_id=None, stats=None, max_output=None):
+    if dict_id is not None:
+        (bit_length,) = struct.unpack_from(">Q", blob)
+        dictionary = load_dictionary(dict_id, version=blob[8:8 + VERSION_SIZE])
+        with stage(stats, "unpack"):
+            return bytes(decode_data(blob[8 + VERSION_SIZE:], dictionary["huffman"], bit_length,
+                                     max_output=max_output))
+    bit_length, size = struct.unpack_from(">QH", blob)
+    offset = struct.calcsize(">QH")
+    freq = {}
+    for _ in range(size):
+        byte, count = struct.unpack_from(">BI", blob, offset)
+        freq[byte] = count
+        offset += struct.calcsize(">BI")
+    with stage(stats, "tree"):
+        codes = build_codes(build_huffman_tree(freq))
+    with stage(stats, "unpack"):
+        return bytes(decode_data(blob[offset:], codes, bit_length, max_output=max_output))
+
+def pack_codes(codes, width):
+    """
+    Packs integers below 2 ** width into width bits each, big-endian, zero-padded to a byte.
+    """
+    bits = "".join(f"{code:0{width}b}" for code in codes)
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big") if bits else b""
+
+def unpack_codes(blob, width):
+    """
+    Reverses pack_codes. width must be at least 8, so the padding can't hold a whole code.
+    """
+    bits = f"{int.from_bytes(blob, 'big'):0{len(blob) * 8}b}"
+    return [int(bits[i:i + width], 2) for i in range(0, len(bits) - width + 1, width)]
+
+def write_varint(out, value):
+    """
+    Appends value to out as a LEB128 varint: 7 bits per byte, high bit set on all but the last.
+    """
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(blob, offset):
+    """
+    Reads a varint written by write_varint. Returns (value, offset after it).
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(blob):
+            raise ValueError("Truncated varint")
+        byte = blob[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def lzw_compress(data, dict_id=None, stats=None):
+    """
+    Codes are stored as 32-bit integers, the same layout lzw.py writes to .lzw files.
+    With a pretrained dictionary the inputs are meant to be small, so the
+    layout is the dictionary version, one byte with the code width and then
+    the codes packed at that width.
+    """
+    if not data:
+        return b""
+    if dict_id is None:
+        return array.array('I', lzw_encode(data, None, stats)).tobytes()
+    dictionary = load_dictionary(dict_id)
+    codes = lzw_encode(data, dictionary["lzw"], stats)
+    width = max(max(codes).bit_length(), 8)
+    return dictionary["version"] + bytes([width]) + pack_codes(codes, width)
+
+def lzw_decompress(blob, dict_id=None, stats=None, max_output=None):
+    if not blob:
+        return b""
+    preset = None
+    if dict_id is not None:
+        preset = load_dictionary(dict_id, version=blob[:VERSION_SIZE])["lzw"]
+        width = blob[VERSION_SIZE]
+        return lzw_decode(unpack_codes(blob[VERSION_SIZE + 1:], width), preset, stats, max_output)
+    codes = array.array('I')
+    codes.frombytes(blob)
+    return lzw_decode(codes.tolist(), preset, stats, max_output)
+
+def lz77_compress_bytes(data, dict_id=None, stats=None):
+    """
+    Each triple is stored as distance, length and the next byte
+    (256 when there is no next byte).
+    With a pretrained dictionary the inputs are meant to be small, so the
+    layout is the dictionary version followed by two kinds of varint-tagged
+    items: n << 1, then n literal bytes (a run of (0, 0, byte) triples); or
+    length << 1 | 1, the distance and the next byte, which only the last
+    triple may leave out. Matches that take at least as many bytes as the
+    bytes they cover are written as literals instead.
+    """
+    if dict_id is None:
+        out = bytearray()
+        for distance, length, next_char in lz77_compress(data, LZ77_WINDOW_SIZE, b"", stats):
+            out += struct.pack(">IIH", distance, length, next_char[0] if next_char else 256)
+        return bytes(out)
+    dictionary = load_dictionary(dict_id)
+    out = bytearray(dictionary["version"])
+    literals = bytearray()
+    position = 0
+    for distance, length, next_char in lz77_compress(data, LZ77_WINDOW_SIZE, dictionary["lz77"], stats):
+        match = bytearray()
+        if length:
+            write_varint(match, length << 1 | 1)
+            write_varint(match, distance)
+            match += next_char
+        covered = length + len(next_char)
+        if not length or covered <= len(match):
+            literals += data[position:position + covered]
+        else:
+            if literals:
+                write_varint(out, len(literals) << 1)
+                out += literals
+                literals.clear()
+            out += match
+        position += covered
+    if literals:
+        write_varint(out, len(literals) << 1)
+        out += literals
+    return bytes(out)
+
+def lz77_decompress_bytes(blob, dict_id=None, stats=None, max_output=None):
+    triples = []
+    if dict_id is not None:
+        preset = load_dictionary(dict_id, version=blob[:VERSION_SIZE])["lz77"]
+        offset = VERSION_SIZE
+        while offset < len(blob):
+            tag, offset = read_varint(blob, offset)
+            if tag & 1:
+                distance, offset = read_varint(blob, offset)
+                triples.append((distance, tag >> 1, blob[offset:offset + 1]))
+                offset += 1
+            else:
+                if offset + (tag >> 1) > len(blob):
+                    raise ValueError("Truncated literal run")
+                triples.extend((0, 0, blob[i:i + 1]) for i in range(offset, offset + (tag >> 1)))
+                offset += tag >> 1
+        return lz77_decompress(triples, preset, stats, max_output)
+    preset = b""
+    for distance, length, char in struct.iter_unpack(">IIH", blob):
+        triples.append((distance, length, bytes([char]) if char < 256 else b""))
+    return lz77_decompress(triples, preset, stats, max_output)
+
+def deflate_compress(data, dict_id=None, stats=None):
+    """
+    Treats the bytes as grayscale pixels, same as compress_image does after decoding an image.
+    """
+    if not data:
+        return b""
+    huffman_codes, packed_data = compress_pixels(np.frombuffer(data, dtype=np.uint8), stats)
+    return pickle.dumps(huffman_codes) + packed_data
+
+CODECS = {
+    "huffman": Codec("huffman", huffman_compress, huffman_decompress),
+    "lzw": Codec("lzw", lzw_compress, lzw_decompress),
+    "lz77": Codec("lz77", lz77_compress_bytes, lz77_decompress_bytes),
+}
+if compress_pixels is not None:
+    CODECS["deflate"] = Codec("deflate", deflate_compress)
+
+def get_codec(name):
+    """
+    Returns the codec registered under name.
+    """
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}', expected one of: {', '.join(CODECS)}")
+    return CODECS[name]
@@ -0,0 +1,65 @@
+"""Optional instrumentation for the codecs.
+
+Codecs take a stats=None argument. When it is None nothing is recorded;
+when a CodecStats is passed, the codec records how long each stage took
+and counters such as bytes processed or matches found.
+
+    stats = CodecStats()
+    compress_file("song.wav", stats=stats)
+    print(stats.as_dict())
+
+Hot loops accumulate into local variables and report once at the end,
+so CodecStats methods are never called per byte.
+"""
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+class CodecStats:
+    """Per-stage timings (seconds) and counters collected during one or more codec calls.
+
+    callback, if given, is called as callback(stage, seconds) every time a stage finishes.
+    """
+    def __init__(self, callback=None):
+        self.timings = {}
+        self.counters = {}
+        self.callback = callback
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the body of a with block as the given stage.
+        """
+        start = perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """
+        Adds seconds to a stage, for stages timed by the codec itself.
+        """
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if self.callback is not None:
+            self.callback(name, seconds)
+
+    def count(self, name, n=1):
+        """
+        Increments a counter.
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        """
+        Sets a counter to a value, e.g. a final dictionary size.
+        """
+        self.counters[name] = value
+
+    def as_dict(self):
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+def stage(stats, name):
+    """
+    Returns stats.stage(name), or a no-op context manager when stats is None.
+    """
+    return stats.stage(name) if stats is not None else nullcontext()
@@ -1,11 +1,14 @@
 import numpy as np
-from collections import Counter
 import heapq
 from PIL import Image
 import os
 import pickle
 from datetime import datetime
-import matplotlib.pyplot as plt
+from codec_stats import stage
+from histogram import run_histogram
+
+PACK_CHUNK = 64 * 1024
+RLE_CHUNK = 1024 * 1024
 
 class HuffmanNode:
     def __init__(self, symbol, freq):
@@ -40,6 +43,7 @@ def generate_huffman_codes(root, current_code="", codes=None):
     return codes
 
 def rle_encode(pixels):
+    # plain reference version, test_deflate.py checks rle_runs against it
     encoded = []
     count = 1
     current = pixels[0]
@@ -53,23 +57,96 @@ def rle_encode(pixels):
     encoded.append((current, count))
     return encoded
 
-def compress_image(image_path, output_path):
-    img = Image.open(image_path).convert('L')
-    pixels = np.array(img).flatten()
-    rle_data = rle_encode(pixels)
-    symbols = [(pixel, run) for pixel, run in rle_data]
-    frequencies = Counter(symbols)
-    huffman_tree = build_huffman_tree(frequencies)
-    huffman_codes = generate_huffman_codes(huffman_tree)
-    compressed_data = ""
-    for symbol in symbols:
-        compressed_data += huffman_codes[symbol]
-    with open(output_path, 'wb') as f:
-        pickle.dump(huffman_codes, f)
-        packed_data = int(compressed_data, 2).to_bytes((len(compressed_data) + 7) // 8, 'big')
-        f.write(packed_data)
-
-    return len(packed_data)
+def split_runs(values, lengths):
+    # splits runs longer than 255 the same way rle_encode does
+    pieces = (lengths + 254) // 255
+    runs = np.full(int(pieces.sum()), 255, dtype=np.uint8)
+    runs[np.cumsum(pieces) - 1] = lengths - (pieces - 1) * 255
+    return np.repeat(values, pieces), runs
+
+def rle_runs(pixels):
+    # same runs as rle_encode (capped at 255), as two arrays; the pixels are
+    # scanned in blocks so temporaries stay small, the run at the end of a
+    # block is carried over in case the next block continues it
+    pixels = np.asarray(pixels).ravel()
+    values_parts, runs_parts = [], []
+    carry_value, carry_length = None, 0
+    for start in range(0, len(pixels), RLE_CHUNK):
+        block = pixels[start:start + RLE_CHUNK]
+        starts = np.concatenate(([0], np.flatnonzero(block[1:] != block[:-1]) + 1))
+        lengths = np.diff(np.append(starts, len(block)))
+        values = block[starts]
+        if carry_length and values[0] == carry_value:
+            lengths[0] += carry_length
+        elif carry_length:
+            values = np.concatenate(([carry_value], values)).astype(block.dtype)
+            lengths = np.concatenate(([carry_length], lengths))
+        carry_value, carry_length = values[-1], int(lengths[-1])
+        block_values, block_runs = split_runs(values[:-1], lengths[:-1])
+        values_parts.append(block_values)
+        runs_parts.append(block_runs)
+    if carry_length:
+        block_values, block_runs = split_runs(np.array([carry_value], dtype=pixels.dtype),
+                                              np.array([carry_length]))
+        values_parts.append(block_values)
+        runs_parts.append(block_runs)
+    if not values_parts:
+        return pixels, np.zeros(0, dtype=np.uint8)
+    return np.concatenate(values_parts), np.concatenate(runs_parts)
+
+def build_pixel_codes(pixels, stats=None):
+    # returns the RLE runs, their Huffman codes and the total encoded length in bits
+    with stage(stats, 'rle'):
+        values, runs = rle_runs(pixels)
+    with stage(stats, 'frequency'):
+        frequencies = run_histogram(values, runs)
+    with stage(stats, 'tree'):
+        huffman_tree = build_huffman_tree(frequencies)
+        huffman_codes = generate_huffman_codes(huffman_tree)
+    total_bits = sum(count * len(huffman_codes[symbol]) for symbol, count in frequencies.items())
+    if stats is not None:
+        stats.count('pixels', len(pixels))
+        stats.count('runs', len(values))
+        stats.set('code_table_size', len(huffman_codes))
+    return values, runs, huffman_codes, total_bits
+
+def iter_packed(values, runs, huffman_codes, total_bits):
+    # packs the codes chunk by chunk; like int(bits, 2).to_bytes(...) the
+    # padding goes in front, so the output is the same as packing all bits at once
+    pending = '0' * (-total_bits % 8)
+    for start in range(0, len(values), PACK_CHUNK):
+        symbols = zip(values[start:start + PACK_CHUNK].tolist(), runs[start:start + PACK_CHUNK].tolist())
+        bits = pending + ''.join(huffman_codes[symbol] for symbol in symbols)
+        whole = len(bits) - len(bits) % 8
+        if whole:
+            yield int(bits[:whole], 2).to_bytes(whole // 8, 'big')
+        pending = bits[whole:]
+
+def compress_pixels(pixels, stats=None):
+    values, runs, huffman_codes, total_bits = build_pixel_codes(pixels, stats)
+    with stage(stats, 'pack'):
+        packed_data = b''.join(iter_packed(values, runs, huffman_codes, total_bits))
+    if stats is not None:
+        stats.count('bytes_out', len(packed_data))
+    return huffman_codes, packed_data
+
+def compress_image(image_path, output_path, stats=None):
+    with stage(stats, 'read'):
+        # asarray + ravel give a view of the decoded pixels instead of two
+        # copies, and the image itself is not kept alive next to them
+        pixels = np.asarray(Image.open(image_path).convert('L')).ravel()
+    values, runs, huffman_codes, total_bits = build_pixel_codes(pixels, stats)
+    packed_size = 0
+    with stage(stats, 'pack'):
+        with open(output_path, 'wb') as f:
+            pickle.dump(huffman_codes, f)
+            for chunk in iter_packed(values, runs, huffman_codes, total_bits):
+                f.write(chunk)
+                packed_size += len(chunk)
+    if stats is not None:
+        stats.count('bytes_out', packed_size)
+
+    return packed_size
 
 def show_results(input_image, output_file, output=False):
     start = datetime.now()
@@ -83,9 +160,9 @@ def show_results(input_image, output_file, output=False):
         print(f'Time: {end - start}')
     return (start_size, end_size)
 
-show_results('test_image.bmp', 'compressed.png')
-
 def statistics(file_pairs):
+    import matplotlib.pyplot as plt
+
     file_names = []
     original_sizes = []
     compressed_sizes = []
@@ -133,5 +210,7 @@ def statistics(file_pairs):
         print(f"Час стиснення: {compression_times[i]:.2f} секунд")
     plt.show()
 
-statistics([('test_image.bmp', 'a_compressed.png'),
-            ('250-251.jpg', '250-251-compressed.png')])
+if __name__ == "__main__":
+    show_results('test_image.bmp', 'compressed.png')
+    statistics([('test_image.bmp', 'a_compressed.png'),
+                ('250-251.jpg', '250-251-compressed.png')])
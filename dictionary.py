@@ -0,0 +1,198 @@
+"""Pretrained dictionaries shared by many small files.
+
+A dictionary is trained once on a sample corpus and saved under an id.
+It holds a Huffman code table that covers every byte value, a primed
+LZW phrase table and a preset LZ77 window, so small files don't have to
+pay for building (and storing) their own tables.
+
+Every dictionary carries a version, a short hash of its tables.
+Compressed data stores it next to the id, so data is never decoded
+with a dictionary that was retrained under the same id.
+"""
+import os
+import re
+import pickle
+import hashlib
+import argparse
+from itertools import chain
+from collections.abc import Iterable
+
+from histogram import file_byte_histogram
+
+DICT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dictionaries")
+LZW_MAX_SIZE = 4096
+LZ77_WINDOW_SIZE = 10000
+VERSION_SIZE = 8
+READ_SIZE = 64 * 1024
+
+DICT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+_loaded = {}
+
+def check_dict_id(dict_id):
+    """
+    Raises ValueError unless dict_id is a plain name (letters, digits, _ and -).
+    Dictionaries are unpickled, so an id must never point outside the dictionary directory.
+    """
+    if not isinstance(dict_id, str) or not DICT_ID_PATTERN.fullmatch(dict_id):
+        raise ValueError(f"Invalid dictionary id {dict_id!r}, expected letters, digits, '_' or '-'")
+
+def dictionary_path(dict_id, dict_dir=None):
+    """
+    Returns the path of the file holding the dictionary with the given id,
+    in dict_dir or DICT_DIR.
+    """
+    check_dict_id(dict_id)
+    dict_dir = dict_dir or DICT_DIR
+    root = os.path.realpath(dict_dir)
+    path = os.path.realpath(os.path.join(root, f"{dict_id}.dict"))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"Dictionary id {dict_id!r} resolves outside {dict_dir}")
+    return path
+
+def dictionary_version(dictionary):
+    """
+    Returns the version of a dictionary: the first VERSION_SIZE bytes of a SHA-256 of its tables.
+    """
+    content = pickle.dumps((dictionary["huffman"], dictionary["lzw"], dictionary["lz77"]))
+    return hashlib.sha256(content).digest()[:VERSION_SIZE]
+
+def iter_samples(sample_paths, read_size=READ_SIZE):
+    """
+    Yields the contents of the sample files one chunk at a time, as if they were concatenated.
+    """
+    for path in sample_paths:
+        with open(path, "rb") as f:
+            while chunk := f.read(read_size):
+                yield chunk
+
+def samples_tail(sample_paths, size):
+    """
+    Returns the last size bytes of the concatenated sample files.
+    """
+    tail = b""
+    for path in reversed(sample_paths):
+        if len(tail) >= size:
+            break
+        with open(path, "rb") as f:
+            f.seek(max(os.path.getsize(path) - (size - len(tail)), 0))
+            tail = f.read() + tail
+    return tail
+
+def count_lzw_phrases(data: Iterable[int], counts: dict, max_size: int = LZW_MAX_SIZE):
+    """
+    Runs LZW over data, any iterable of byte values, from the 256 single
+    bytes, and adds to counts how often every longer phrase is matched.
+    A phrase is matched whenever one of its extensions is, so it never
+    counts less than they do.
+    """
+    table = {bytes([i]) for i in range(256)}
+    P = b""
+    for byte in data:
+        C = bytes([byte])
+        if P + C in table:
+            P = P + C
+            if len(P) > 1:
+                counts[P] = counts.get(P, 0) + 1
+        else:
+            if len(table) < max_size:
+                table.add(P + C)
+            P = C
+
+def most_used(counts: dict, size: int) -> list[bytes]:
+    """
+    Returns the size most counted phrases; shorter phrases win ties, so the
+    prefixes of a returned phrase are returned too.
+    """
+    return sorted(counts, key=lambda phrase: (-counts[phrase], len(phrase), phrase))[:size]
+
+def train_lzw_table(samples: Iterable[Iterable[int]], max_size: int = LZW_MAX_SIZE) -> list[bytes]:
+    """
+    Builds an LZW phrase table from samples, each an iterable of byte values.
+    The index of a phrase is its code. Each sample is run through LZW on its
+    own, the way a small file is encoded, and the phrases matched most often
+    across all of them fill the table after the 256 single bytes. Counts are
+    pruned to the most used phrases as they grow, so memory stays bounded.
+    """
+    keep = max_size - 256
+    counts = {}
+    for data in samples:
+        count_lzw_phrases(data, counts, max_size)
+        if len(counts) > 16 * max_size:
+            counts = {phrase: counts[phrase] for phrase in most_used(counts, 4 * max_size)}
+    return [bytes([i]) for i in range(256)] + most_used(counts, keep)
+
+def train_dictionary(sample_paths, dict_id, lzw_max_size=LZW_MAX_SIZE,
+                     lz77_window_size=LZ77_WINDOW_SIZE, dict_dir=None):
+    """
+    Trains a dictionary on the given sample files and saves it.
+    The samples are read one file, or one chunk, at a time; they are
+    never concatenated in memory. Returns the path of the saved dictionary.
+    """
+    from huffman import build_huffman_tree, build_codes
+
+    dict_dir = dict_dir or DICT_DIR
+
+    # every byte gets a count of at least 1 so any input can be encoded
+    counts = [1] * 256
+    for path in sample_paths:
+        for byte, count in enumerate(file_byte_histogram(path)):
+            counts[byte] += count
+    freq = dict(enumerate(counts))
+
+    dictionary = {
+        "id": dict_id,
+        "huffman": build_codes(build_huffman_tree(freq)),
+        "lzw": train_lzw_table((chain.from_iterable(iter_samples([path])) for path in sample_paths),
+                               lzw_max_size),
+        "lz77": samples_tail(sample_paths, lz77_window_size),
+    }
+    dictionary["version"] = dictionary_version(dictionary)
+    os.makedirs(dict_dir, exist_ok=True)
+    path = dictionary_path(dict_id, dict_dir)
+    with open(path, "wb") as f:
+        pickle.dump(dictionary, f)
+    _loaded.pop((dict_id, dict_dir), None)
+    return path
+
+def read_dictionary(dict_id, dict_dir):
+    """
+    Reads a trained dictionary from disk, bypassing the cache.
+    """
+    path = dictionary_path(dict_id, dict_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dictionary '{dict_id}' was not found at {path}")
+    with open(path, "rb") as f:
+        dictionary = pickle.load(f)
+    # dictionaries trained before versions were added
+    dictionary.setdefault("version", dictionary_version(dictionary))
+    return dictionary
+
+def load_dictionary(dict_id, dict_dir=None, version=None):
+    """
+    Loads a trained dictionary by id. Dictionaries are cached after the first load.
+    When version is given, raises ValueError unless the dictionary has that version;
+    a cached dictionary with another version is first reloaded, in case it was
+    retrained since this process loaded it.
+    """
+    dict_dir = dict_dir or DICT_DIR
+    key = (dict_id, dict_dir)
+    cached = key in _loaded
+    if not cached:
+        _loaded[key] = read_dictionary(dict_id, dict_dir)
+    dictionary = _loaded[key]
+    if version is not None and version != dictionary["version"] and cached:
+        dictionary = _loaded[key] = read_dictionary(dict_id, dict_dir)
+    if version is not None and version != dictionary["version"]:
+        raise ValueError(f"Dictionary '{dict_id}' has version {dictionary['version'].hex()}, "
+                         f"but the data was compressed with version {bytes(version).hex()}")
+    return dictionary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a shared compression dictionary.")
+    parser.add_argument("dict_id")
+    parser.add_argument("samples", nargs="+")
+    parser.add_argument("--lzw-max-size", type=int, default=LZW_MAX_SIZE)
+    parser.add_argument("--lz77-window-size", type=int, default=LZ77_WINDOW_SIZE)
+    args = parser.parse_args()
+    print(train_dictionary(args.samples, args.dict_id, args.lzw_max_size, args.lz77_window_size))
@@ -0,0 +1,69 @@
+"""Shared frequency counting for the codecs.
+
+Counting is the first full pass over every input, so it is done with
+np.bincount over np.frombuffer views, one chunk at a time. Nothing is
+copied except the chunk being counted, which also makes it work on
+memory-mapped files. Without NumPy the same functions fall back to
+collections.Counter.
+"""
+import os
+import mmap
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# bincount converts every chunk to intp, so a chunk costs 8 bytes per element
+CHUNK_SIZE = 1024 * 1024
+RUN_BITS = 8
+
+def byte_histogram(data, chunk_size=CHUNK_SIZE):
+    """
+    Returns a list of 256 counts, one per byte value, for any bytes-like data
+    (bytes, bytearray, memoryview, mmap, uint8 NumPy array).
+    """
+    view = memoryview(data).cast("B")
+    if np is None:
+        counts = Counter(view)
+        return [counts.get(byte, 0) for byte in range(256)]
+    total = np.zeros(256, dtype=np.int64)
+    for start in range(0, len(view), chunk_size):
+        total += np.bincount(np.frombuffer(view[start:start + chunk_size], dtype=np.uint8),
+                             minlength=256)
+    return total.tolist()
+
+def file_byte_histogram(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Counts the bytes of a file through a memory map, without reading it into memory.
+    """
+    if os.path.getsize(filepath) == 0:
+        return [0] * 256
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return byte_histogram(mm, chunk_size)
+
+def frequency_dict(counts):
+    """
+    Turns a list of 256 counts into a {byte: count} dict of the bytes that occur.
+    """
+    return {byte: count for byte, count in enumerate(counts) if count}
+
+def run_histogram(pixels, runs, chunk_size=CHUNK_SIZE):
+    """
+    Counts (pixel, run) symbols as produced by RLE. Runs must be below
+    2 ** RUN_BITS. Each symbol is packed into one integer,
+    pixel << RUN_BITS | run, so it can be counted with bincount.
+    Returns a {(pixel, run): count} dict.
+    """
+    if np is None:
+        return dict(Counter(zip((int(p) for p in pixels), (int(r) for r in runs))))
+    pixels = np.asarray(pixels)
+    runs = np.asarray(runs)
+    total = np.zeros(256 << RUN_BITS, dtype=np.int64)
+    for start in range(0, len(pixels), chunk_size):
+        keys = (pixels[start:start + chunk_size].astype(np.intp) << RUN_BITS) \
+            | runs[start:start + chunk_size].astype(np.intp)
+        total += np.bincount(keys, minlength=256 << RUN_BITS)
+    mask = (1 << RUN_BITS) - 1
+    return {(key >> RUN_BITS, key & mask): int(total[key]) for key in np.flatnonzero(total).tolist()}
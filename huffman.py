@@ -1,6 +1,21 @@
 """hfn"""
 import os
+import mmap
 import pickle
+import struct
+import tempfile
+from time import perf_counter
+from dictionary import load_dictionary, VERSION_SIZE
+from codec_stats import stage
+from histogram import byte_histogram, frequency_dict
+
+CHUNK_SIZE = 64 * 1024
+# starts .huff files made with a pretrained dictionary; a pickle never starts with it
+DICT_MAGIC = b"HD"
+
+# read once at import, os.umask can only be read by setting it, which isn't thread-safe
+UMASK = os.umask(0)
+os.umask(UMASK)
 
 class Node:
     """_summary_
@@ -12,18 +27,15 @@ class Node:
         self.right = None
 
 def build_frequency_dict(text):
-    """_summary_
+    """Counts how often every byte occurs.
 
     Args:
-        text (_type_): _description_
+        text (bytes): any bytes-like data, including memory maps
 
     Returns:
-        _type_: _description_
+        dict: byte -> count, for the bytes that occur
     """
-    dct = {}
-    for char in text:
-        dct[char] = dct.get(char, 0) + 1
-    return dct
+    return frequency_dict(byte_histogram(text))
 
 def build_huffman_tree(freq):
     """_summary_
@@ -63,60 +75,331 @@ def build_codes(root):
         node, curr = stack.pop()
         if node is not None:
             if node.char is not None:
-                codes[node.char] = curr
+                codes[node.char] = curr or "0"
             else:
                 stack.append((node.left, curr + "0"))
                 stack.append((node.right, curr + "1"))
     return codes
 
-def compress_file(filepath):
-    """_summary_
+def iter_encoded(data, codes, progress=None):
+    """Yields the packed bytes of data chunk by chunk.
 
     Args:
-        filepath (_type_): _description_
+        data (bytes): any bytes-like data, including memory maps
+        codes (dict): byte -> bit string
+        progress (callable, optional): called as progress(done, total) after
+            every chunk of input; it may raise to abort encoding
+
+    Yields:
+        bytes: packed bits, the last chunk padded with zeros
 
     Returns:
-        _type_: _description_
+        int: number of meaningful bits, as the value of StopIteration
     """
-    with open(filepath, "rb") as f:
-        data = f.read()
+    pending = ''
+    whole_bytes = 0
+    for start in range(0, len(data), CHUNK_SIZE):
+        bits = pending + ''.join(codes[byte] for byte in data[start:start + CHUNK_SIZE])
+        whole = len(bits) - len(bits) % 8
+        yield bytes(int(bits[i:i+8], 2) for i in range(0, whole, 8))
+        whole_bytes += whole // 8
+        pending = bits[whole:]
+        if progress is not None:
+            progress(min(start + CHUNK_SIZE, len(data)), len(data))
+    if pending:
+        yield bytes([int(pending.ljust(8, '0'), 2)])
+    return whole_bytes * 8 + len(pending)
 
-    freq_dict = build_frequency_dict(data)
-    tree = build_huffman_tree(freq_dict)
-    codes = build_codes(tree)
+def encoded_length(freq, codes):
+    """Number of bits data with the given byte frequencies takes once encoded.
 
-    encoded_bits = ''.join(codes[byte] for byte in data)
-    padded_bits = encoded_bits + '0' * ((8 - len(encoded_bits) % 8) % 8)
-    byte_array = bytearray(int(padded_bits[i:i+8], 2) for i in range(0, len(padded_bits), 8))
+    Args:
+        freq (dict): byte -> count
+        codes (dict): byte -> bit string
 
-    output_path = os.path.splitext(filepath)[0] + ".huff"
-    with open(output_path, "wb") as out:
-        pickle.dump((byte_array, codes, len(encoded_bits)), out)
-    return output_path
+    Returns:
+        int: bit length
+    """
+    return sum(count * len(codes[byte]) for byte, count in freq.items())
 
-def decompress_file(filepath):
-    """_summary_
+def encode_data(data, codes, progress=None):
+    """Packs data into bytes using the given Huffman codes.
 
     Args:
-        filepath (_type_): _description_
+        data (bytes): bytes to encode
+        codes (dict): byte -> bit string
+        progress (callable, optional): called as progress(done, total) after
+            every chunk of input; it may raise to abort encoding
 
     Returns:
-        _type_: _description_
+        tuple: (byte_array, bit_length)
+    """
+    byte_array = bytearray()
+    chunks = iter_encoded(data, codes, progress)
+    while True:
+        try:
+            byte_array += next(chunks)
+        except StopIteration as done:
+            return byte_array, done.value
+
+def iter_decoded(byte_array, codes, bit_length, progress=None):
+    """Yields the decoded data chunk by chunk.
+
+    Args:
+        byte_array (bytes): packed bits, any bytes-like object including memory maps
+        codes (dict): byte -> bit string used for encoding
+        bit_length (int): number of meaningful bits
+        progress (callable, optional): called as progress(done, total) after
+            every chunk of packed bytes; it may raise to abort decoding
+
+    Yields:
+        bytearray: decoded bytes
     """
-    with open(filepath, "rb") as f:
-        byte_array, codes, bit_length = pickle.load(f)
     reversed_codes = {v: k for k, v in codes.items()}
-    bit_string = ''.join(f"{byte:08b}" for byte in byte_array)
-    bit_string = bit_string[:bit_length]
     curr = ""
+    for start in range(0, len(byte_array), CHUNK_SIZE):
+        bit_string = ''.join(f"{byte:08b}" for byte in byte_array[start:start + CHUNK_SIZE])
+        bit_string = bit_string[:max(bit_length - start * 8, 0)]
+        result = bytearray()
+        for bit in bit_string:
+            curr += bit
+            if curr in reversed_codes:
+                result.append(reversed_codes[curr])
+                curr = ""
+        yield result
+        if progress is not None:
+            progress(min(start + CHUNK_SIZE, len(byte_array)), len(byte_array))
+
+def decode_data(byte_array, codes, bit_length, progress=None, max_output=None):
+    """Unpacks bytes produced by encode_data.
+
+    Args:
+        byte_array (bytearray): packed bits
+        codes (dict): byte -> bit string used for encoding
+        bit_length (int): number of meaningful bits
+        progress (callable, optional): called as progress(done, total) after
+            every chunk of packed bytes; it may raise to abort decoding
+        max_output (int, optional): raise ValueError once the output grows
+            past this many bytes
+
+    Returns:
+        bytearray: decoded data
+    """
     result = bytearray()
-    for bit in bit_string:
-        curr += bit
-        if curr in reversed_codes:
-            result.append(reversed_codes[curr])
-            curr = ""
+    for chunk in iter_decoded(byte_array, codes, bit_length, progress):
+        result += chunk
+        if max_output is not None and len(result) > max_output:
+            raise ValueError(f"Decompressed output exceeds {max_output} bytes")
+    return result
+
+def map_file(f):
+    """Memory-maps an open binary file for reading.
+
+    Args:
+        f (file): file opened in "rb" mode
+
+    Returns:
+        mmap or bytes: the map, or b"" for an empty file (which can't be mapped)
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def output_mode(output_path):
+    """Permission bits for a new output file: those of the file it replaces,
+    or what open() would give a new file under the current umask.
+
+    Args:
+        output_path (str): file about to be written
+
+    Returns:
+        int: mode for os.chmod
+    """
+    try:
+        return os.stat(output_path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+def pack_dictionary_header(dict_id, version, bit_length):
+    """Header of a .huff file made with a pretrained dictionary: DICT_MAGIC,
+    the id's length and the id, the dictionary version and the bit length.
+
+    Args:
+        dict_id (str): dictionary id
+        version (bytes): dictionary version
+        bit_length (int): number of meaningful bits
+
+    Returns:
+        bytes: the header
+    """
+    name = dict_id.encode("ascii")
+    return DICT_MAGIC + struct.pack(">B", len(name)) + name + version + struct.pack(">Q", bit_length)
+
+def read_header(f):
+    """Reads the header of a .huff file.
+
+    Args:
+        f (file): .huff file opened in "rb" mode, positioned at the start
+
+    Returns:
+        tuple: the pickled header, or ((dictionary id, version), bit length)
+            for files made with a pretrained dictionary
+    """
+    if f.read(len(DICT_MAGIC)) != DICT_MAGIC:
+        f.seek(0)
+        return pickle.load(f)
+    (size,) = struct.unpack(">B", f.read(1))
+    dict_id = f.read(size).decode("ascii")
+    version = f.read(VERSION_SIZE)
+    (bit_length,) = struct.unpack(">Q", f.read(8))
+    return (dict_id, version), bit_length
+
+def write_chunks(output_path, chunks, header=None, stats=None, chunk_stage=None):
+    """Writes raw chunks to a file, after a pickled header if one is given.
+
+    The data goes to a temporary file in the same directory that only
+    replaces output_path once everything is written. An existing file at
+    output_path, which may be the memory-mapped input itself, is never
+    truncated, and nothing but the temporary file is removed if writing
+    fails or is cancelled. The output gets the permissions of the file it
+    replaces, or the umask's for a new file, not those of the temporary file.
+
+    Args:
+        output_path (str): file to create
+        chunks (iterable): bytes-like chunks of data
+        header (tuple or bytes, optional): written before the data, tuples are pickled
+        stats (CodecStats, optional): time spent producing chunks is added
+            to chunk_stage and time spent writing them to "write"
+        chunk_stage (str, optional): stage name for producing the chunks
+
+    Returns:
+        int: number of data bytes written
+    """
+    written = 0
+    produce_time = 0.0
+    start = perf_counter()
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)),
+                                     suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if isinstance(header, bytes):
+                out.write(header)
+            elif header is not None:
+                pickle.dump(header, out)
+            mark = perf_counter()
+            for chunk in chunks:
+                produced = perf_counter()
+                produce_time += produced - mark
+                out.write(chunk)
+                written += len(chunk)
+                mark = perf_counter()
+            produce_time += perf_counter() - mark
+        os.chmod(temp_path, output_mode(output_path))
+        os.replace(temp_path, output_path)
+        write_time = perf_counter() - start - produce_time
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if stats is not None:
+        stats.add_time(chunk_stage, produce_time)
+        stats.add_time("write", write_time)
+    return written
+
+def compress_file(filepath, dict_id=None, stats=None, progress=None):
+    """Compresses a file into a .huff file next to it.
+
+    The input is memory-mapped and the packed bits are written as they are
+    produced, so neither the input nor the output is held in memory.
+    With a mapped input the pages are read in by the first pass over it,
+    so "read" only covers mapping the file and disk reads show up in
+    "frequency".
+    The file holds a pickled (codes, bit length) header followed by the
+    packed bits. With a pretrained dictionary, which is meant for small
+    files, the header is the few bytes from pack_dictionary_header instead.
+
+    Args:
+        filepath (str): file to compress
+        dict_id (str, optional): pretrained dictionary to use instead of
+            building a code table for this file
+        stats (CodecStats, optional): collects per-stage timings and counters
+        progress (callable, optional): called as progress(done, total) in
+            input bytes while encoding; raising from it cancels compression
+
+    Returns:
+        str: path of the compressed file
+    """
+    output_path = os.path.splitext(filepath)[0] + ".huff"
+    # taken up front: compressing a .huff file replaces the input
+    input_size = os.path.getsize(filepath)
+    with open(filepath, "rb") as f:
+        with stage(stats, "read"):
+            data = map_file(f)
+        try:
+            with stage(stats, "frequency"):
+                freq_dict = build_frequency_dict(data)
+            if dict_id is None:
+                with stage(stats, "tree"):
+                    tree = build_huffman_tree(freq_dict)
+                    codes = build_codes(tree)
+                bit_length = encoded_length(freq_dict, codes)
+                header = (codes, bit_length)
+            else:
+                dictionary = load_dictionary(dict_id)
+                codes = dictionary["huffman"]
+                # with a pretrained dictionary only its id and version are stored, not the table
+                bit_length = encoded_length(freq_dict, codes)
+                header = pack_dictionary_header(dict_id, dictionary["version"], bit_length)
+            write_chunks(output_path, iter_encoded(data, codes, progress), header, stats, "pack")
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    if stats is not None:
+        stats.count("bytes_in", input_size)
+        stats.count("bytes_out", os.path.getsize(output_path))
+        stats.count("table_builds", 1 if dict_id is None else 0)
+        stats.set("code_table_size", len(codes))
+    return output_path
+
+def decompress_file(filepath, stats=None, progress=None):
+    """Decompresses a .huff file, writing the output chunk by chunk.
+
+    Args:
+        filepath (str): file produced by compress_file
+        stats (CodecStats, optional): collects per-stage timings and counters
+        progress (callable, optional): called as progress(done, total) in
+            compressed bytes while decoding; raising from it cancels decompression
+
+    Returns:
+        str: path of the decompressed file
+    """
     output_path = os.path.splitext(filepath)[0] + "_decompressed.wav"
-    with open(output_path, "wb") as out:
-        out.write(result)
+    with open(filepath, "rb") as f:
+        with stage(stats, "read"):
+            header = read_header(f)
+            offset = f.tell()
+            data = map_file(f)
+            view = memoryview(data)[offset:]
+        try:
+            if len(header) == 3:
+                # files written before the header/data split keep the data in the pickle
+                byte_array, codes, bit_length = header
+            else:
+                codes, bit_length = header
+                byte_array = view
+            if isinstance(codes, tuple):
+                dict_id, version = codes
+                codes = load_dictionary(dict_id, version=version)["huffman"]
+            elif isinstance(codes, str):
+                # files written before dictionaries had versions
+                codes = load_dictionary(codes)["huffman"]
+            written = write_chunks(output_path, iter_decoded(byte_array, codes, bit_length, progress),
+                                   stats=stats, chunk_stage="unpack")
+        finally:
+            view.release()
+            if isinstance(data, mmap.mmap):
+                data.close()
+    if stats is not None:
+        stats.count("bytes_in", os.path.getsize(filepath))
+        stats.count("bytes_out", written)
 
     return output_path
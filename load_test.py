@@ -0,0 +1,137 @@
+"""Client and load test for server.py.
+
+Usage:
+    python load_test.py --codec huffman --connections 8 --requests 200 --file LZ77/input_text1.txt
+
+Every request compresses the payload and, with --verify, decompresses the
+result and checks it matches. Prints latency percentiles and throughput.
+"""
+import sys
+import asyncio
+import argparse
+import statistics
+from time import perf_counter
+
+from server import HOST, PORT, read_header, read_payload, write_frame
+from samples import synthetic_data
+
+class CompressionClient:
+    """One connection to the compression server; requests on it are sent one at a time."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host=HOST, port=PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, codec, data, dict_id=None):
+        """
+        Sends one request and returns the response payload.
+        Raises RuntimeError if the server reports an error.
+        """
+        await write_frame(self.writer, {"op": op, "codec": codec, "size": len(data), "dict_id": dict_id}, data)
+        header = await read_header(self.reader)
+        if header is None:
+            raise ConnectionError("Server closed the connection")
+        if header.get("status") != "ok":
+            raise RuntimeError(header.get("error", "unknown error"))
+        return await read_payload(self.reader, header["size"])
+
+    async def compress(self, codec, data, dict_id=None):
+        return await self.request("compress", codec, data, dict_id)
+
+    async def decompress(self, codec, data, dict_id=None):
+        return await self.request("decompress", codec, data, dict_id)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            # the server drops the connection after rejecting a request
+            pass
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile (0-100) of values using linear interpolation.
+    """
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+async def run_load_test(codec, data, connections=4, requests=100, verify=False,
+                        dict_id=None, host=HOST, port=PORT):
+    """
+    Sends requests compress requests spread over connections concurrent
+    connections. Returns a dict with latencies (seconds), errors and wall time.
+    """
+    latencies = []
+    errors = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        client = await CompressionClient.connect(host, port)
+        try:
+            for _ in remaining:
+                start = perf_counter()
+                try:
+                    blob = await client.compress(codec, data, dict_id)
+                    if verify and await client.decompress(codec, blob, dict_id) != data:
+                        raise RuntimeError("round trip did not restore the input")
+                except RuntimeError as e:
+                    errors.append(str(e))
+                    continue
+                except ConnectionError as e:
+                    errors.append(str(e))
+                    break
+                latencies.append(perf_counter() - start)
+        finally:
+            await client.close()
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return {"latencies": latencies, "errors": errors, "wall_time": perf_counter() - start}
+
+def report(result, size):
+    latencies = result["latencies"]
+    done = len(latencies)
+    wall = result["wall_time"]
+    print(f"requests: {done} ok, {len(result['errors'])} failed in {wall:.2f} s")
+    if result["errors"]:
+        print(f"first error: {result['errors'][0]}")
+    if not latencies:
+        return
+    print(f"throughput: {done / wall:.1f} req/s, {done * size / wall / 1e6:.3f} MB/s")
+    print("latency (ms): " + "  ".join(
+        f"p{p} {percentile(latencies, p) * 1000:.1f}" for p in (50, 90, 99)
+    ) + f"  mean {statistics.mean(latencies) * 1000:.1f}  max {max(latencies) * 1000:.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the compression server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--codec", default="huffman")
+    parser.add_argument("--dict-id")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--file", help="payload file (default: synthetic text)")
+    parser.add_argument("--size", type=int, default=16 * 1024, help="synthetic payload size")
+    parser.add_argument("--verify", action="store_true", help="decompress and compare every result")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+    else:
+        data = dict(synthetic_data(args.size))["synthetic_text"]
+    result = asyncio.run(run_load_test(args.codec, data, args.connections, args.requests,
+                                       args.verify, args.dict_id, args.host, args.port))
+    report(result, len(data))
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,30 @@
 import wave
 from wave import Wave_write, Wave_read
 import os
+import mmap
 import time
-import matplotlib.pyplot as plt
 import array
+import struct
 
-def read_wav_file(filename: str) -> tuple[bytes, Wave_read] | None:
+def find_data_chunk(file) -> tuple[int, int]:
+    """
+    Returns the offset and size of the 'data' chunk of an open WAV file.
+    """
+    file.seek(12) # пропускаємо заголовок RIFF: 'RIFF', розмір, 'WAVE'
+    while True:
+        header = file.read(8)
+        if len(header) < 8:
+            raise wave.Error("data chunk not found")
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"data":
+            return file.tell(), size
+        file.seek(size + (size & 1), 1)
+
+def read_wav_file(filename: str, use_mmap: bool = False) -> tuple[bytes, Wave_read] | None:
     """
     Reads a WAV file, returning its audio data and parameters.
+    With use_mmap the audio data is a memoryview over a memory-mapped file
+    instead of a copy in memory.
     """
     if not os.path.exists(filename):
         print(f"Error: File named '{filename}' was not found.")
@@ -15,8 +32,17 @@ def read_wav_file(filename: str) -> tuple[bytes, Wave_read] | None:
     try:
         with wave.open(filename, "rb") as wav:
             audio_params = wav.getparams()
-            frames = wav.readframes(audio_params.nframes)
-            return frames, audio_params
+            if not use_mmap:
+                frames = wav.readframes(audio_params.nframes)
+                return frames, audio_params
+        with open(filename, "rb") as file:
+            offset, size = find_data_chunk(file)
+            length = min(size, audio_params.nframes * audio_params.nchannels * audio_params.sampwidth)
+            if length == 0:
+                return b"", audio_params
+            # the view keeps the map alive after the file is closed
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped)[offset:offset + length], audio_params
     except wave.Error as e:
         print(f"Error while reading file named '{filename}': {e}")
         return None, None
@@ -34,14 +60,53 @@ def write_wav_file(filename: str, audio_params, frames: bytes) -> None:
         wav.setparams(audio_params)
         wav.writeframes(frames)
 
-def lzw_encode(data: bytes) -> list[int]:
+class CodeWriter:
+    """
+    List-like sink for lzw_encode that writes codes to a binary file in blocks
+    of 32-bit integers (the .lzw layout) instead of keeping them in memory.
+    """
+    def __init__(self, file, block_size: int = 65536):
+        self.file = file
+        self.block_size = block_size
+        self.block = array.array('I')
+        self.written = 0
+
+    def append(self, code: int) -> None:
+        self.block.append(code)
+        if len(self.block) >= self.block_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.block.tofile(self.file)
+        self.written += len(self.block)
+        self.block = array.array('I')
+
+    def __len__(self) -> int:
+        return self.written + len(self.block)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+def lzw_encode(data: bytes, preset: list[bytes] | None = None, stats=None, sink=None) -> list[int]:
     """
     Encodes the given byte data using LZW.
+    preset is a pretrained phrase table (see dictionary.py), the index of a phrase is its code.
+    stats, if given, receives the encoding time, code count and final dictionary size.
+    sink, if given, is a list-like object (e.g. CodeWriter) the codes are appended to
+    instead of a new list; it is also what gets returned.
     """
-    table = {bytes([i]): i for i in range(256)} # початковий словник, де кожен елемент - 1 байт.
-    next_code = 256
+    if stats is not None:
+        start = time.perf_counter()
+    if preset is None:
+        table = {bytes([i]): i for i in range(256)} # початковий словник, де кожен елемент - 1 байт.
+    else:
+        table = {phrase: code for code, phrase in enumerate(preset)}
+    next_code = len(table)
     P = bytes([data[0]])
-    result = []
+    result = [] if sink is None else sink
 
     for byte in data[1:]:
         C = bytes([byte])
@@ -54,14 +119,27 @@ def lzw_encode(data: bytes) -> list[int]:
             P = C
 
     result.append(table[P])
+    if stats is not None:
+        stats.add_time("encode", time.perf_counter() - start)
+        stats.count("bytes_in", len(data))
+        stats.count("codes", len(result))
+        stats.set("dictionary_size", len(table))
     return result
 
-def lzw_decode(codes: list[int]) -> bytes:
+def lzw_decode(codes: list[int], preset: list[bytes] | None = None, stats=None,
+               max_output: int | None = None) -> bytes:
     """
     Decodes the given byte data using LZW.
+    preset must be the same phrase table that was used for encoding.
+    Raises ValueError as soon as the output would grow past max_output bytes.
     """
-    table = {i: bytes([i]) for i in range(256)}
-    next_code = 256
+    if stats is not None:
+        start = time.perf_counter()
+    if preset is None:
+        table = {i: bytes([i]) for i in range(256)}
+    else:
+        table = dict(enumerate(preset))
+    next_code = len(table)
     OLD = codes[0]
     S = table[OLD]
     result = bytearray(S)
@@ -72,12 +150,19 @@ def lzw_decode(codes: list[int]) -> bytes:
             S = table[OLD] + C
         else:
             S = table[NEW]
+        if max_output is not None and len(result) + len(S) > max_output:
+            raise ValueError(f"Decompressed output exceeds {max_output} bytes")
         result += S
         C = S[:1]
         table[next_code] = table[OLD] + C
         next_code += 1
         OLD = NEW
 
+    if stats is not None:
+        stats.add_time("decode", time.perf_counter() - start)
+        stats.count("codes", len(codes))
+        stats.count("bytes_out", len(result))
+        stats.set("dictionary_size", len(table))
     return bytes(result)
 
 def calculate_compression_ratio(original_size: int, compressed_size: int) -> float:
@@ -98,64 +183,6 @@ def check_loss(original: bytes, decoded: bytes) -> bool:
     """
     return original != decoded
 
-# Логіка для аудіо
-audio_data, wav_audio_params = read_wav_file("Charli xcx - Mean girls featuring julian casablancas (audio).wav")
-original_size = len(audio_data)
-
-# Стиснення
-start_compress = time.time()
-compressed_codes = lzw_encode(audio_data)
-end_compress = time.time()
-compression_time = end_compress - start_compress
-
-# Запис стисненого у бінарному вигляді
-with open("compressed.lzw", "wb") as file:
-    arr = array.array('I', compressed_codes)
-    arr.tofile(file)
-
-compressed_size = calculate_file_size("compressed.lzw")
-
-# Розпакування
-start_decompress = time.time()
-with open("compressed.lzw", "rb") as file:
-    arr = array.array('I')
-    arr.fromfile(file, compressed_size // arr.itemsize)
-    codes = arr.tolist()
-
-decoded_audio = lzw_decode(codes)
-end_decompress = time.time()
-decompression_time = end_decompress - start_decompress
-
-# Запис декодованого звуку
-write_wav_file("output.wav", wav_audio_params, decoded_audio)
-
-# Аналіз
-compression_ratio = calculate_compression_ratio(original_size, compressed_size)
-is_lossy = check_loss(audio_data, decoded_audio)
-
-print(f"Original size (bytes): {original_size}")
-print(f"Compressed size (bytes): {compressed_size}")
-print(f"Compression time: {compression_time:.4f} seconds")
-print(f"Decompression time: {decompression_time:.4f} seconds")
-print(f"Lossy compression: {'Yes' if is_lossy else 'No'}")
-
-# Графік
-percentage = compressed_size / original_size * 100
-labels = ['Оригінал', 'Стиснений']
-values = [1.0, compressed_size / original_size]
-percentages = [100.0, percentage]
-
-plt.bar(labels, values, color=['gray', 'skyblue'])
-plt.ylabel('Ступінь стиснення')
-plt.title('Порівняння з Оригіналом')
-
-for i, val in enumerate(values):
-    plt.text(i, val + 0.02, f"{percentages[i]:.1f}%", \
-ha='center', va='bottom', fontsize=12, fontweight='bold')
-
-plt.ylim(0, 1.2)
-plt.show()
-
 # Cтиснення тексту
 def lzw_compress(input_text: str) -> list[int]:
     """
@@ -202,61 +229,118 @@ def lzw_decompress(codes: list[int]) -> str:
 
     return result
 
-test_files = ["short.txt", "medium.txt", "large.txt"]
-
-results = []
-
-# Аналіз
-for filename in test_files:
-    with open(filename, "r", encoding="utf-8") as f:
-        text = f.read()
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-    original_size = len(text.encode("utf-8"))
+    # Логіка для аудіо
+    audio_data, wav_audio_params = read_wav_file("Charli xcx - Mean girls featuring julian casablancas (audio).wav", use_mmap=True)
+    original_size = len(audio_data)
 
+    # Стиснення з записом у бінарному вигляді по блоках
     start_compress = time.time()
-    compressed = lzw_compress(text)
+    with open("compressed.lzw", "wb") as file, CodeWriter(file) as writer:
+        lzw_encode(audio_data, sink=writer)
     end_compress = time.time()
+    compression_time = end_compress - start_compress
 
-    compressed_size = len(compressed) * 2
+    compressed_size = calculate_file_size("compressed.lzw")
 
+    # Розпакування
     start_decompress = time.time()
-    decompressed = lzw_decompress(compressed)
+    with open("compressed.lzw", "rb") as file:
+        arr = array.array('I')
+        arr.fromfile(file, compressed_size // arr.itemsize)
+        codes = arr.tolist()
+
+    decoded_audio = lzw_decode(codes)
     end_decompress = time.time()
+    decompression_time = end_decompress - start_decompress
 
-    info_loss = text != decompressed
-
-    results.append({
-        "file": filename,
-        "original_size": original_size,
-        "compressed_size": compressed_size,
-        "compression_ratio": original_size / compressed_size, #має бути > 1
-        "compression_time": end_compress - start_compress,
-        "decompression_time": end_decompress - start_decompress,
-        "info_loss": info_loss,
-    })
-
-# Результат
-print("{:<10} {:>15} {:>17} {:>20} {:>20} {:>20} {:>15}".format(
-    "File", "Original Size", "Compressed Size", "Compression Ratio",
-    "Compression Time", "Decompression Time", "Info Loss"
-))
-for res in results:
-    print("{:<10} {:>15} {:>17} {:>20.2f} {:>20.6f} {:>20.6f} {:>15}".format(
-        res["file"], res["original_size"], res["compressed_size"],
-        res["compression_ratio"], res["compression_time"],
-        res["decompression_time"], str(res["info_loss"])
-    ))
+    # Запис декодованого звуку
+    write_wav_file("output.wav", wav_audio_params, decoded_audio)
+
+    # Аналіз
+    compression_ratio = calculate_compression_ratio(original_size, compressed_size)
+    is_lossy = check_loss(audio_data, decoded_audio)
+
+    print(f"Original size (bytes): {original_size}")
+    print(f"Compressed size (bytes): {compressed_size}")
+    print(f"Compression time: {compression_time:.4f} seconds")
+    print(f"Decompression time: {decompression_time:.4f} seconds")
+    print(f"Lossy compression: {'Yes' if is_lossy else 'No'}")
+
+    # Графік
+    percentage = compressed_size / original_size * 100
+    labels = ['Оригінал', 'Стиснений']
+    values = [1.0, compressed_size / original_size]
+    percentages = [100.0, percentage]
 
+    plt.bar(labels, values, color=['gray', 'skyblue'])
+    plt.ylabel('Ступінь стиснення')
+    plt.title('Порівняння з Оригіналом')
 
-file_labels = [res["file"] for res in results]
-ratios = [res["compression_ratio"] for res in results]
+    for i, val in enumerate(values):
+        plt.text(i, val + 0.02, f"{percentages[i]:.1f}%", \
+    ha='center', va='bottom', fontsize=12, fontweight='bold')
 
-# Графік
-plt.figure(figsize=(10, 6))
-plt.bar(file_labels, ratios, color="skyblue")
-plt.title("Ступінь стиснення")
-plt.ylabel("Стиснене")
-plt.xlabel("Файл")
-plt.grid(True, linestyle="--", alpha=0.6)
-plt.tight_layout()
-plt.show()  
+    plt.ylim(0, 1.2)
+    plt.show()
+
+    test_files = ["short.txt", "medium.txt", "large.txt"]
+
+    results = []
+
+    # Аналіз
+    for filename in test_files:
+        with open(filename, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        original_size = len(text.encode("utf-8"))
+
+        start_compress = time.time()
+        compressed = lzw_compress(text)
+        end_compress = time.time()
+
+        compressed_size = len(compressed) * 2
+
+        start_decompress = time.time()
+        decompressed = lzw_decompress(compressed)
+        end_decompress = time.time()
+
+        info_loss = text != decompressed
+
+        results.append({
+            "file": filename,
+            "original_size": original_size,
+            "compressed_size": compressed_size,
+            "compression_ratio": original_size / compressed_size, #має бути > 1
+            "compression_time": end_compress - start_compress,
+            "decompression_time": end_decompress - start_decompress,
+            "info_loss": info_loss,
+        })
+
+    # Результат
+    print("{:<10} {:>15} {:>17} {:>20} {:>20} {:>20} {:>15}".format(
+        "File", "Original Size", "Compressed Size", "Compression Ratio",
+        "Compression Time", "Decompression Time", "Info Loss"
+    ))
+    for res in results:
+        print("{:<10} {:>15} {:>17} {:>20.2f} {:>20.6f} {:>20.6f} {:>15}".format(
+            res["file"], res["original_size"], res["compressed_size"],
+            res["compression_ratio"], res["compression_time"],
+            res["decompression_time"], str(res["info_loss"])
+        ))
+
+
+    file_labels = [res["file"] for res in results]
+    ratios = [res["compression_ratio"] for res in results]
+
+    # Графік
+    plt.figure(figsize=(10, 6))
+    plt.bar(file_labels, ratios, color="skyblue")
+    plt.title("Ступінь стиснення")
+    plt.ylabel("Стиснене")
+    plt.xlabel("Файл")
+    plt.grid(True, linestyle="--", alpha=0.6)
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,21 @@
+"""Synthetic inputs shared by the benchmark and the load test.
+
+Only depends on the standard library, so tools can import it without
+pulling in the codecs.
+"""
+import random
+
+def synthetic_data(size, seed=0):
+    """
+    Returns named synthetic inputs: all zeros, random bytes and repetitive text.
+    """
+    rng = random.Random(seed)
+    words = [b"lorem", b"ipsum", b"dolor", b"sit", b"amet", b"compression", b"window"]
+    text = bytearray()
+    while len(text) < size:
+        text += rng.choice(words) + b" "
+    return [
+        ("synthetic_zeros", bytes(size)),
+        ("synthetic_random", rng.randbytes(size)),
+        ("synthetic_text", bytes(text[:size])),
+    ]
@@ -0,0 +1,264 @@
+"""Asyncio compression service.
+
+Protocol (one TCP connection can carry any number of requests, one after another):
+
+    request:  {"op": "compress" | "decompress", "codec": "huffman", "size": N, "dict_id": null}\\n
+              followed by N bytes of data
+    response: {"status": "ok", "size": M}\\n followed by M bytes
+              or {"status": "error", "error": "..."}\\n
+
+The codecs run in worker processes. Requests wait in a bounded queue in
+front of the workers. A request's payload is only read once it has one
+of queue size + workers slots, so at most that many payloads are held in
+memory; while none is free the server stops reading from the connection
+and clients are pushed back instead of piling up data. A worker that runs past the timeout is killed and
+replaced, and decompression stops once the output passes
+--max-output-bytes, so one bad request can't keep a worker busy.
+
+Usage:
+    python server.py --port 8765 --workers 4
+"""
+import os
+import json
+import asyncio
+import argparse
+import multiprocessing
+
+from codec_registry import CODECS, get_codec
+from dictionary import check_dict_id
+
+HOST = "127.0.0.1"
+PORT = 8765
+CHUNK_SIZE = 64 * 1024
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+MAX_OUTPUT_BYTES = 256 * 1024 * 1024
+QUEUE_SIZE = 16
+TIMEOUT = 60.0
+
+# workers must not be forked from this process, which runs the event loop
+# and the pools' handler threads; forking a threaded process can deadlock the child
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+class ProtocolError(Exception):
+    """A request that breaks the protocol; the connection is closed after reporting it."""
+
+def run_job(op, codec_name, data, dict_id=None, max_output=MAX_OUTPUT_BYTES):
+    """
+    Runs one compress/decompress call. Executed in a worker process.
+    """
+    codec = get_codec(codec_name)
+    if op == "compress":
+        return codec.compress(data, dict_id)
+    if codec.decompress is None:
+        raise ValueError(f"Codec '{codec_name}' does not support decompression")
+    return codec.decompress(data, dict_id, max_output=max_output)
+
+class Worker:
+    """One worker process that runs a job at a time.
+
+    A running job can't be cancelled, so the whole process is terminated
+    and a fresh one started instead.
+    """
+    def __init__(self):
+        self.context = multiprocessing.get_context(START_METHOD)
+        self.pool = self.context.Pool(1)
+
+    async def run(self, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(method, value):
+            if not future.done():
+                method(value)
+
+        self.pool.apply_async(
+            run_job, args,
+            callback=lambda r: loop.call_soon_threadsafe(resolve, future.set_result, r),
+            error_callback=lambda e: loop.call_soon_threadsafe(resolve, future.set_exception, e))
+        return await future
+
+    def restart(self):
+        self.pool.terminate()
+        self.pool = self.context.Pool(1)
+
+    def close(self):
+        self.pool.terminate()
+
+async def read_header(reader):
+    """
+    Reads one JSON header line. Returns None when the peer closed the connection.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        header = json.loads(line)
+    except ValueError as e:
+        raise ProtocolError(f"Malformed header: {e}") from e
+    if not isinstance(header, dict):
+        raise ProtocolError("Header must be a JSON object")
+    return header
+
+async def read_payload(reader, size):
+    """
+    Reads exactly size bytes in chunks.
+    """
+    data = bytearray()
+    while len(data) < size:
+        data += await reader.readexactly(min(CHUNK_SIZE, size - len(data)))
+    return bytes(data)
+
+async def write_frame(writer, header, payload=b""):
+    """
+    Writes a header line and its payload in chunks, waiting for the peer to keep up.
+    """
+    writer.write(json.dumps(header).encode() + b"\n")
+    for i in range(0, len(payload), CHUNK_SIZE):
+        writer.write(payload[i:i + CHUNK_SIZE])
+        await writer.drain()
+    await writer.drain()
+
+class CompressionServer:
+    """Accepts connections and feeds their requests to worker processes through a bounded queue."""
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE,
+                 max_request_bytes=MAX_REQUEST_BYTES, timeout=TIMEOUT,
+                 max_output_bytes=MAX_OUTPUT_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # one slot per payload held in memory: queued or running
+        self.slots = asyncio.Semaphore(queue_size + self.workers)
+        self.max_request_bytes = max_request_bytes
+        self.max_output_bytes = max_output_bytes
+        self.timeout = timeout
+        self.pool_workers = []
+        self.dispatchers = []
+
+    async def dispatch(self, worker):
+        """
+        Moves jobs from the queue to one worker. When a request gives up
+        (times out) while its job is still running, the worker is restarted
+        so the job stops using CPU and memory.
+        """
+        while True:
+            args, future = await self.queue.get()
+            try:
+                if future.done():
+                    continue
+                job = asyncio.ensure_future(worker.run(*args))
+                await asyncio.wait((job, future), return_when=asyncio.FIRST_COMPLETED)
+                if not job.done():
+                    job.cancel()
+                    worker.restart()
+                elif not future.done():
+                    if job.exception() is not None:
+                        future.set_exception(job.exception())
+                    else:
+                        future.set_result(job.result())
+            finally:
+                self.queue.task_done()
+
+    def check_request(self, header):
+        if header.get("op") not in ("compress", "decompress"):
+            raise ValueError(f"Unknown op '{header.get('op')}'")
+        if header.get("codec") not in CODECS:
+            raise ValueError(f"Unknown codec '{header.get('codec')}'")
+        if header.get("dict_id") is not None:
+            check_dict_id(header["dict_id"])
+
+    async def handle_request(self, header, reader):
+        size = header.get("size")
+        if not isinstance(size, int) or size < 0:
+            raise ProtocolError("Header must contain a non-negative integer size")
+        if size > self.max_request_bytes:
+            raise ProtocolError(f"Request of {size} bytes exceeds the limit of {self.max_request_bytes}")
+        # blocks while all slots are taken, so nothing more is read from this client
+        async with self.slots:
+            data = await read_payload(reader, size)
+            self.check_request(header)
+            args = (header["op"], header["codec"], data, header.get("dict_id"), self.max_output_bytes)
+            try:
+                return await asyncio.wait_for(self.submit(args), self.timeout)
+            except asyncio.TimeoutError as e:
+                raise TimeoutError(f"Request took longer than {self.timeout} s") from e
+
+    async def submit(self, args):
+        """
+        Queues a job and waits for its result. If the wait is cancelled,
+        the job's future is cancelled too, so the dispatcher skips or abandons it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await self.queue.put((args, future))
+            return await future
+        finally:
+            future.cancel()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await read_header(reader)
+                    if header is None:
+                        break
+                    result = await self.handle_request(header, reader)
+                except ProtocolError as e:
+                    await write_frame(writer, {"status": "error", "error": str(e)})
+                    break
+                except Exception as e:
+                    await write_frame(writer, {"status": "error", "error": str(e)})
+                    continue
+                await write_frame(writer, {"status": "ok", "size": len(result)}, result)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT):
+        """
+        Starts the workers and begins accepting connections. Returns the
+        asyncio server; port 0 picks a free port, see server.sockets.
+        """
+        self.pool_workers = [Worker() for _ in range(self.workers)]
+        self.dispatchers = [asyncio.create_task(self.dispatch(worker)) for worker in self.pool_workers]
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        """
+        Stops the dispatchers and terminates the worker processes.
+        """
+        for task in self.dispatchers:
+            task.cancel()
+        for worker in self.pool_workers:
+            worker.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await self.start(host, port)
+        print(f"Serving {', '.join(CODECS)} on {host}:{port} with {self.workers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the compression codecs over TCP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="requests allowed to wait for a worker")
+    parser.add_argument("--max-request-bytes", type=int, default=MAX_REQUEST_BYTES)
+    parser.add_argument("--max-output-bytes", type=int, default=MAX_OUTPUT_BYTES,
+                        help="largest output a decompression may produce")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT,
+                        help="seconds a request may take, including time in the queue")
+    args = parser.parse_args(argv)
+    server = CompressionServer(args.workers, args.queue_size, args.max_request_bytes, args.timeout,
+                               args.max_output_bytes)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
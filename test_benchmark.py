@@ -0,0 +1,25 @@
+import os
+import multiprocessing
+
+from benchmark import memory_case, case_result
+
+def exit_without_result(results):
+    os._exit(3)
+
+def run_case_process(target, args):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=target, args=args + (results,))
+    process.start()
+    result = case_result(process, results, poll=0.2)
+    process.join()
+    return result
+
+def test_failing_memory_case_reports_error(tmp_path):
+    wall, _, _, error = run_case_process(memory_case, ("huffman", "after", str(tmp_path / "missing.txt")))
+    assert wall is None
+    assert error.startswith("FileNotFoundError")
+
+def test_memory_case_process_that_dies_reports_exit_code(tmp_path):
+    _, _, _, error = run_case_process(exit_without_result, ())
+    assert error == "process exited with code 3"
@@ -0,0 +1,20 @@
+import pytest
+
+from codec_registry import CODECS, get_codec
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_empty_input(name):
+    codec = get_codec(name)
+    compressed = codec.compress(b"")
+    if codec.decompress is not None:
+        assert codec.decompress(compressed) == b""
+
+@pytest.mark.parametrize("name", [name for name, codec in CODECS.items() if codec.decompress])
+@pytest.mark.parametrize("data", [b"a", b"abracadabra" * 50, bytes(range(256)) * 4])
+def test_round_trip(name, data):
+    codec = get_codec(name)
+    assert codec.decompress(codec.compress(data)) == data
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match="Unknown codec"):
+        get_codec("zip")
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+import codec_stats
+from codec_stats import CodecStats
+from huffman import compress_file, decompress_file
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "LZ77"))
+from lz77_comression import lz77_compress
+
+def test_compress_file_records_stages_and_counters(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"stats for every stage " * 500)
+    stats = CodecStats()
+    compressed = compress_file(str(path), stats=stats)
+    assert set(stats.timings) == {"read", "frequency", "tree", "pack", "write"}
+    assert all(seconds >= 0 for seconds in stats.timings.values())
+    assert stats.counters["bytes_in"] == os.path.getsize(path)
+    assert stats.counters["bytes_out"] == os.path.getsize(compressed)
+    assert stats.counters["table_builds"] == 1
+
+    stats = CodecStats()
+    decompress_file(compressed, stats=stats)
+    assert set(stats.timings) == {"read", "unpack", "write"}
+    assert stats.counters["bytes_out"] == os.path.getsize(path)
+
+def test_callback_sees_every_stage(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"callback " * 100)
+    seen = []
+    compress_file(str(path), stats=CodecStats(lambda name, seconds: seen.append(name)))
+    assert sorted(set(seen)) == ["frequency", "pack", "read", "tree", "write"]
+
+def test_lz77_match_counters():
+    # a, b, c are literals, then (3, 3, "a") and (3, 2, end of input)
+    stats = CodecStats()
+    triples = lz77_compress(b"abcabcabc", 20, stats=stats)
+    assert triples == [(0, 0, b"a"), (0, 0, b"b"), (0, 0, b"c"), (3, 3, b"a"), (3, 2, b"")]
+    assert stats.counters["tokens"] == 5
+    assert stats.counters["matches"] == 2
+    assert stats.counters["match_length_total"] == 5
+    assert stats.counters["avg_match_length"] == 2.5
+    assert set(stats.timings) == {"match_search", "window"}
+
+def test_no_stats_records_nothing(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("stats recorded without a CodecStats")
+    for method in ("stage", "add_time", "count", "set"):
+        monkeypatch.setattr(CodecStats, method, fail)
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"no stats " * 100)
+    decompress_file(compress_file(str(path)))
+    lz77_compress(b"abcabcabc", 20)
+    with codec_stats.stage(None, "anything") as value:
+        assert value is None
@@ -0,0 +1,36 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+import deflate
+from deflate import rle_encode, rle_runs, compress_pixels
+
+def as_pairs(values, runs):
+    return [(int(v), int(r)) for v, r in zip(values, runs)]
+
+@pytest.mark.parametrize("pixels", [
+    [5],
+    [1, 1, 1, 1, 1, 1, 1, 2],
+    [0] * 7 + [1] * 7,
+    [3] * 600,
+    [0, 1] * 20,
+    [9] * 6 + [9] * 8 + [4] * 300 + [4],
+])
+def test_rle_runs_matches_rle_encode_across_blocks(monkeypatch, pixels):
+    monkeypatch.setattr(deflate, "RLE_CHUNK", 7)
+    pixels = np.array(pixels, dtype=np.uint8)
+    assert as_pairs(*rle_runs(pixels)) == [(int(p), r) for p, r in rle_encode(pixels)]
+
+def test_rle_runs_random_pixels(monkeypatch):
+    monkeypatch.setattr(deflate, "RLE_CHUNK", 7)
+    rng = np.random.default_rng(0)
+    pixels = np.repeat(rng.integers(0, 4, 200), rng.integers(1, 400, 200)).astype(np.uint8)
+    assert as_pairs(*rle_runs(pixels)) == [(int(p), r) for p, r in rle_encode(pixels)]
+
+def test_compress_pixels_matches_whole_string_packing():
+    rng = np.random.default_rng(1)
+    pixels = np.repeat(rng.integers(0, 8, 500), rng.integers(1, 30, 500)).astype(np.uint8)
+    codes, packed = compress_pixels(pixels)
+    bits = "".join(codes[(int(p), r)] for p, r in rle_encode(pixels))
+    assert packed == int(bits, 2).to_bytes((len(bits) + 7) // 8, "big")
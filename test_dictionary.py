@@ -0,0 +1,100 @@
+import os
+import glob
+import shutil
+
+import pytest
+
+import dictionary
+from dictionary import train_dictionary, load_dictionary, dictionary_path
+from huffman import compress_file, decompress_file
+from codec_registry import CODECS
+
+DATA = b"the quick brown fox jumps over the lazy dog " * 40
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.fixture
+def dict_dir(tmp_path, monkeypatch):
+    folder = tmp_path / "dictionaries"
+    monkeypatch.setattr(dictionary, "DICT_DIR", str(folder))
+    monkeypatch.setattr(dictionary, "_loaded", {})
+    return folder
+
+def train(tmp_path, dict_id, sample):
+    path = tmp_path / f"{dict_id}-sample.txt"
+    path.write_bytes(sample)
+    return train_dictionary([str(path)], dict_id)
+
+def test_compress_file_with_dictionary(tmp_path, dict_dir):
+    train(tmp_path, "english", b"the lazy brown dog sleeps " * 100)
+    path = tmp_path / "input.txt"
+    path.write_bytes(DATA)
+    assert open(decompress_file(compress_file(str(path), dict_id="english")), "rb").read() == DATA
+
+@pytest.mark.parametrize("codec", ["huffman", "lzw", "lz77"])
+def test_codecs_with_dictionary(tmp_path, dict_dir, codec):
+    train(tmp_path, "english", b"the lazy brown dog sleeps " * 100)
+    blob = CODECS[codec].compress(DATA, "english")
+    assert CODECS[codec].decompress(blob, "english") == DATA
+
+def test_retrained_dictionary_is_rejected(tmp_path, dict_dir):
+    train(tmp_path, "english", b"the lazy brown dog sleeps " * 100)
+    path = tmp_path / "input.txt"
+    path.write_bytes(DATA)
+    compressed = compress_file(str(path), dict_id="english")
+    blobs = {name: CODECS[name].compress(DATA, "english") for name in ("huffman", "lzw", "lz77")}
+
+    train(tmp_path, "english", b"lorem ipsum dolor sit amet " * 100)
+    with pytest.raises(ValueError, match="version"):
+        decompress_file(compressed)
+    for name, blob in blobs.items():
+        with pytest.raises(ValueError, match="version"):
+            CODECS[name].decompress(blob, "english")
+
+def test_training_matches_concatenated_samples(tmp_path, dict_dir):
+    samples = [b"abcabcabd" * 50, b"", b"xyz" * 10]
+    paths = []
+    for i, sample in enumerate(samples):
+        paths.append(tmp_path / f"sample{i}")
+        paths[-1].write_bytes(sample)
+    train_dictionary([str(p) for p in paths], "joined", lz77_window_size=100)
+    corpus = b"".join(samples)
+    trained = load_dictionary("joined")
+    assert trained["lz77"] == corpus[-100:]
+    assert trained["lzw"] == dictionary.train_lzw_table(samples)
+    assert set(trained["huffman"]) == set(range(256))
+
+def test_lzw_table_keeps_prefixes_of_its_phrases():
+    table = dictionary.train_lzw_table([b"abcabcabcabd" * 30, b"xyzxyzabc" * 30], max_size=300)
+    assert len(table) == 300
+    phrases = set(table)
+    assert all(phrase[:-1] in phrases for phrase in table[256:])
+
+def test_small_file_shrinks_with_dictionary(tmp_path, dict_dir):
+    samples = sorted(glob.glob(os.path.join(ROOT, "*", "*.txt")))
+    train_dictionary(samples, "text")
+    path = tmp_path / "short.txt"
+    shutil.copy(os.path.join(ROOT, "lzw_txt", "short.txt"), path)
+    data = path.read_bytes()
+    compressed = compress_file(str(path), dict_id="text")
+    assert os.path.getsize(compressed) < len(data)
+    assert open(decompress_file(compressed), "rb").read() == data
+    for name in ("huffman", "lzw", "lz77"):
+        blob = CODECS[name].compress(data, "text")
+        assert len(blob) < len(data), name
+        assert CODECS[name].decompress(blob, "text") == data
+
+@pytest.mark.parametrize("dict_id", ["../evil", "a/b", "", "a.b", 5, None])
+def test_invalid_dictionary_ids(dict_dir, dict_id):
+    with pytest.raises(ValueError):
+        dictionary_path(dict_id)
+
+def test_dictionary_retrained_by_another_process_is_reloaded(tmp_path, dict_dir):
+    train(tmp_path, "english", b"the lazy brown dog sleeps " * 100)
+    old = load_dictionary("english")
+    # another process retrains it; this process still has the old one cached
+    train(tmp_path, "english", b"lorem ipsum dolor sit amet " * 100)
+    new = dictionary.read_dictionary("english", str(dict_dir))
+    dictionary._loaded[("english", str(dict_dir))] = old
+    assert load_dictionary("english", version=new["version"])["version"] == new["version"]
+    with pytest.raises(ValueError, match="version"):
+        load_dictionary("english", version=old["version"])
@@ -1,12 +1,12 @@
 import os
 import time
-import matplotlib.pyplot as plt
 from huffman import compress_file, decompress_file
 
 def get_file_size(filepath):
     return os.path.getsize(filepath)
 
 def visualize(filepaths):
+    import matplotlib.pyplot as plt
     file_names = [os.path.basename(f) for f in filepaths]
     compress_times = []
     decompress_times = []
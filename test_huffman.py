@@ -0,0 +1,88 @@
+import os
+import pickle
+import random
+
+import pytest
+
+import huffman
+from huffman import (build_frequency_dict, build_huffman_tree, build_codes,
+                     encode_data, compress_file, decompress_file)
+
+class Stop(Exception):
+    pass
+
+def stop(done, total):
+    raise Stop()
+
+def round_trip(path):
+    return open(decompress_file(compress_file(str(path))), "rb").read()
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"a",
+    b"z" * 1000,
+    bytes(random.Random(0).randrange(256) for _ in range(3 * huffman.CHUNK_SIZE + 17)),
+    bytes(random.Random(1).choice(b"abc") for _ in range(10000)),
+], ids=["empty", "one-byte", "single-symbol", "random", "three-symbols"])
+def test_compress_file_round_trip(tmp_path, data):
+    path = tmp_path / "input.txt"
+    path.write_bytes(data)
+    assert round_trip(path) == data
+
+def test_decompress_legacy_three_tuple_file(tmp_path):
+    data = b"legacy files keep the packed bits inside the pickle"
+    codes = build_codes(build_huffman_tree(build_frequency_dict(data)))
+    byte_array, bit_length = encode_data(data, codes)
+    path = tmp_path / "old.huff"
+    with open(path, "wb") as f:
+        pickle.dump((byte_array, codes, bit_length), f)
+    assert open(decompress_file(str(path)), "rb").read() == data
+
+def test_compress_file_named_huff_keeps_input_readable(tmp_path):
+    data = b"already has the output's name " * 300
+    path = tmp_path / "input.huff"
+    path.write_bytes(data)
+    compressed = compress_file(str(path))
+    assert compressed == str(path)
+    assert open(decompress_file(compressed), "rb").read() == data
+
+def test_cancelled_compress_leaves_no_output(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"cancel me " * 20000)
+    with pytest.raises(Stop):
+        compress_file(str(path), progress=stop)
+    assert os.listdir(tmp_path) == ["input.txt"]
+
+def test_cancelled_compress_keeps_existing_output(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"cancel me " * 20000)
+    (tmp_path / "input.huff").write_bytes(b"previous output")
+    with pytest.raises(Stop):
+        compress_file(str(path), progress=stop)
+    assert sorted(os.listdir(tmp_path)) == ["input.huff", "input.txt"]
+    assert (tmp_path / "input.huff").read_bytes() == b"previous output"
+
+def test_cancelled_decompress_leaves_no_output(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"cancel me " * 20000)
+    compressed = compress_file(str(path))
+    with pytest.raises(Stop):
+        decompress_file(compressed, progress=stop)
+    assert sorted(os.listdir(tmp_path)) == ["input.huff", "input.txt"]
+
+def test_outputs_follow_umask(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"permissions " * 100)
+    # the input was created with open(), so it has the umask's permissions
+    expected = os.stat(path).st_mode & 0o777
+    compressed = compress_file(str(path))
+    decompressed = decompress_file(compressed)
+    assert os.stat(compressed).st_mode & 0o777 == expected
+    assert os.stat(decompressed).st_mode & 0o777 == expected
+
+def test_compress_in_place_keeps_mode(tmp_path):
+    path = tmp_path / "input.huff"
+    path.write_bytes(b"keep my mode " * 100)
+    os.chmod(path, 0o640)
+    compress_file(str(path))
+    assert os.stat(path).st_mode & 0o777 == 0o640
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import struct
+
+import pytest
+
+from server import CompressionServer
+from load_test import CompressionClient
+
+DATA = b"the quick brown fox jumps over the lazy dog " * 100
+
+def run_with_server(scenario, **options):
+    """
+    Runs scenario(server, client) against a CompressionServer on a free port.
+    """
+    async def main():
+        server = CompressionServer(**options)
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        client = await CompressionClient.connect("127.0.0.1", port)
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+    return asyncio.run(main())
+
+@pytest.mark.parametrize("codec", ["huffman", "lzw", "lz77"])
+def test_round_trip(codec):
+    async def scenario(server, client):
+        compressed = await client.compress(codec, DATA)
+        return await client.decompress(codec, compressed)
+    assert run_with_server(scenario, workers=1) == DATA
+
+def test_oversized_request_is_rejected():
+    async def scenario(server, client):
+        with pytest.raises(RuntimeError, match="exceeds the limit"):
+            await client.compress("huffman", b"x" * 1001)
+    run_with_server(scenario, workers=1, max_request_bytes=1000)
+
+def test_unknown_codec_and_bad_dictionary_id():
+    async def scenario(server, client):
+        with pytest.raises(RuntimeError, match="Unknown codec"):
+            await client.compress("zip", DATA)
+        with pytest.raises(RuntimeError, match="Invalid dictionary id"):
+            await client.compress("huffman", DATA, dict_id="../evil")
+        # errors in a request keep the connection usable
+        return await client.compress("huffman", b"")
+    run_with_server(scenario, workers=1)
+
+def test_decompression_bomb_is_stopped():
+    bomb = struct.pack(">IIH", 0, 0, 65) + struct.pack(">IIH", 1, 300_000_000, 256)
+
+    async def scenario(server, client):
+        with pytest.raises(RuntimeError, match="exceeds 1000000 bytes"):
+            await client.decompress("lz77", bomb)
+    run_with_server(scenario, workers=1, max_output_bytes=1_000_000)
+
+def test_timed_out_job_restarts_worker():
+    async def scenario(server, client):
+        worker = server.pool_workers[0]
+        pool = worker.pool
+        with pytest.raises(RuntimeError, match="longer than"):
+            await client.compress("lz77", os.urandom(4_000_000))
+        assert worker.pool is not pool
+        compressed = await client.compress("huffman", DATA)
+        return await client.decompress("huffman", compressed)
+    assert run_with_server(scenario, workers=1, timeout=1.0) == DATA
@@ -0,0 +1,41 @@
+import os
+import queue
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+from ui import Job
+
+def events(messages):
+    result = []
+    while not messages.empty():
+        _, event, value = messages.get_nowait()
+        result.append((event, value))
+    return result
+
+def test_missing_file_reports_error(tmp_path):
+    messages = queue.Queue()
+    Job("compress", str(tmp_path / "missing.txt"), messages).run()
+    posted = events(messages)
+    assert [event for event, _ in posted] == ["started", "error"]
+
+def test_compress_reports_done(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"job " * 50000)
+    messages = queue.Queue()
+    Job("compress", str(path), messages).run()
+    event, value = events(messages)[-1]
+    assert event == "done"
+    assert value["out_path"] == str(tmp_path / "input.huff")
+    assert value["ratio"] > 1
+
+def test_cancelled_job_leaves_no_output(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"job " * 50000)
+    messages = queue.Queue()
+    job = Job("compress", str(path), messages)
+    job.progress = lambda done, total: (job.cancel_event.set(), Job.progress(job, done, total))
+    job.run()
+    assert events(messages)[-1] == ("cancelled", None)
+    assert os.listdir(tmp_path) == ["input.txt"]
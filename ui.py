@@ -1,58 +1,163 @@
 """ui"""
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox
 import os
+import queue
+import threading
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
 from huffman import compress_file, decompress_file
 
+MAX_WORKERS = 2
+POLL_MS = 100
+
+class Cancelled(Exception):
+    """Raised from a progress callback to stop a running job."""
+
+class Job:
+    """One compress/decompress run of a single file on a worker thread.
+
+    Workers never touch Tk; they put (job, event, value) messages on the
+    shared queue and the main loop applies them to the window.
+    """
+    def __init__(self, action, filepath, messages):
+        self.action = action
+        self.filepath = filepath
+        self.messages = messages
+        self.cancel_event = threading.Event()
+
+    def progress(self, done, total):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+        self.messages.put((self, "progress", done / total * 100 if total else 100))
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.messages.put((self, "cancelled", None))
+            return
+        self.messages.put((self, "started", None))
+        func = compress_file if self.action == "compress" else decompress_file
+        start = perf_counter()
+        try:
+            # read before running, compressing a .huff file replaces it
+            in_size = os.path.getsize(self.filepath)
+            out_path = func(self.filepath, progress=self.progress)
+        except Cancelled:
+            self.messages.put((self, "cancelled", None))
+            return
+        except Exception as e:
+            self.messages.put((self, "error", str(e)))
+            return
+        elapsed = perf_counter() - start
+        out_size = os.path.getsize(out_path)
+        original, compressed = (in_size, out_size) if self.action == "compress" else (out_size, in_size)
+        self.messages.put((self, "done", {
+            "out_path": out_path,
+            "throughput": in_size / elapsed / 1e6 if elapsed else float("inf"),
+            "ratio": original / compressed if compressed else float("inf"),
+        }))
+
 def run_ui():
-    """_summary_
+    """Starts the window. Selected files are queued and processed on a
+    small thread pool so the window stays responsive.
     """
     root = tk.Tk()
     root.title("Huffman Compression/Decompression")
-    root.geometry("400x250")
+    root.geometry("640x400")
 
-    selected_file = tk.StringVar(root)
+    selected_files = []
+    messages = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    jobs = {}
 
     def choose_file():
-        path = filedialog.askopenfilename()
-        if path:
-            selected_file.set(path)
-            file_label.config(text=os.path.basename(path))
+        paths = filedialog.askopenfilenames()
+        if paths:
+            selected_files[:] = paths
+            if len(paths) == 1:
+                file_label.config(text=os.path.basename(paths[0]))
+            else:
+                file_label.config(text=f"{len(paths)} files selected")
 
-    def compress_action():
-        filepath = selected_file.get()
-        if filepath:
-            try:
-                out_path = compress_file(filepath)
-                messagebox.showinfo("Success", f"File compressed as: {out_path}")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
-        else:
+    def start(action):
+        if not selected_files:
             messagebox.showwarning("Warning", "Please select a file first.")
+            return
+        for filepath in selected_files:
+            job = Job(action, filepath, messages)
+            item = jobs_view.insert("", "end", values=(os.path.basename(filepath), action, "queued", ""))
+            jobs[job] = item
+            executor.submit(job.run)
+
+    def compress_action():
+        start("compress")
 
     def decompress_action():
-        filepath = selected_file.get()
-        if filepath:
+        start("decompress")
+
+    def cancel_action():
+        chosen = set(jobs_view.selection())
+        for job, item in jobs.items():
+            if not chosen or item in chosen:
+                job.cancel_event.set()
+
+    def set_row(job, status, result=""):
+        name, action = jobs_view.item(jobs[job], "values")[:2]
+        jobs_view.item(jobs[job], values=(name, action, status, result))
+
+    def poll_messages():
+        while True:
             try:
-                out_path = decompress_file(filepath)
-                messagebox.showinfo("Success", f"File decompressed as: {out_path}")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
-        else:
-            messagebox.showwarning("Warning", "Please select a file first.")
+                job, event, value = messages.get_nowait()
+            except queue.Empty:
+                break
+            if event == "started":
+                set_row(job, "running")
+            elif event == "progress":
+                set_row(job, f"{value:.0f}%")
+            elif event == "done":
+                set_row(job, "done", f"{value['throughput']:.2f} MB/s, ratio {value['ratio']:.2f} "
+                                     f"-> {os.path.basename(value['out_path'])}")
+                del jobs[job]
+            elif event == "cancelled":
+                set_row(job, "cancelled")
+                del jobs[job]
+            elif event == "error":
+                set_row(job, "error", value)
+                del jobs[job]
+        root.after(POLL_MS, poll_messages)
+
+    def on_close():
+        for job in jobs:
+            job.cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        root.destroy()
 
-    choose_btn = tk.Button(root, text="Choose File", command=choose_file, font=("Arial", 12))
+    choose_btn = tk.Button(root, text="Choose Files", command=choose_file, font=("Arial", 12))
     choose_btn.pack(pady=10)
 
     file_label = tk.Label(root, text="No file selected", font=("Arial", 14))
-    file_label.pack(pady=10)
+    file_label.pack(pady=5)
+
+    buttons = tk.Frame(root)
+    buttons.pack(pady=5)
+    compress_btn = tk.Button(buttons, text="Compress", command=compress_action, font=("Arial", 14))
+    compress_btn.pack(side="left", padx=5)
+
+    decompress_btn = tk.Button(buttons, text="Decompress", command=decompress_action, font=("Arial", 14))
+    decompress_btn.pack(side="left", padx=5)
 
-    compress_btn = tk.Button(root, text="Compress", command=compress_action, font=("Arial", 14))
-    compress_btn.pack(pady=10)
+    cancel_btn = tk.Button(buttons, text="Cancel", command=cancel_action, font=("Arial", 14))
+    cancel_btn.pack(side="left", padx=5)
 
-    decompress_btn = tk.Button(root, text="Decompress", command=decompress_action, font=("Arial", 14))
-    decompress_btn.pack(pady=10)
+    jobs_view = ttk.Treeview(root, columns=("file", "action", "status", "result"), show="headings")
+    for column, width in (("file", 150), ("action", 90), ("status", 80), ("result", 300)):
+        jobs_view.heading(column, text=column.capitalize())
+        jobs_view.column(column, width=width)
+    jobs_view.pack(fill="both", expand=True, padx=10, pady=10)
 
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(POLL_MS, poll_messages)
     root.mainloop()
 
 if __name__ == "__main__":